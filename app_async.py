@@ -0,0 +1,174 @@
+"""Asyncio variant of the Tsipster API for ASGI servers.
+
+Serves the same endpoints as app.py, backed by the same slip logic (slips.py),
+under Quart. Request handling stays on the event loop: CPU-bound scoring and
+selection run on a thread pool executor, and training/checkpointing after
+accept or reject runs as a background task after the response is sent. One
+process can then hold many concurrent Flutter clients without a thread per
+connection.
+
+Usage:
+    pip install quart quart-cors hypercorn
+    hypercorn app_async:app --bind 127.0.0.1:5000
+    python app_async.py  # development server
+
+TSIPSTER_SCORING_THREADS sets the size of the scoring pool (default: CPU count).
+"""
+import asyncio
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from quart import Quart, Response, abort, request, session, send_file
+
+# Make sure the current directory is included in the path
+current_dir = str(Path(__file__).parent.absolute())
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+import instrumentation
+import json_responses
+import odds_history
+import slips
+from static_assets import StaticIndex
+from instrumentation import log_event
+
+app = Quart(__name__)
+app.secret_key = 'tsipster_secret_key'  # Same key as app.py so sessions work across both servers
+instrumentation.init_async_app(app)
+
+try:
+    from quart_cors import cors
+    # Enable CORS for all routes
+    app = cors(app, allow_origin='*')
+except ImportError:
+    log_event('quart_cors_missing', logging.WARNING)
+
+# CPU-bound scoring runs here, off the event loop
+scoring_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('TSIPSTER_SCORING_THREADS', os.cpu_count() or 4)),
+    thread_name_prefix='scoring')
+# Training steps are serialized on one thread (they hold the model lock anyway)
+training_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training')
+# Keep references to in-flight training so they are not garbage collected
+background_tasks = set()
+
+def training_finished(future):
+    background_tasks.discard(future)
+    if future.exception() is not None:
+        log_event('background_training_failed', logging.ERROR, error=str(future.exception()))
+
+def schedule_training(bet_list, label):
+    """Train and checkpoint in the background instead of inside the request"""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(training_executor, slips.train_now, list(bet_list), label)
+    background_tasks.add(future)
+    future.add_done_callback(training_finished)
+
+def json_response(body, status):
+    """Compact JSON response, compressed when the client accepts it (see json_responses.py)"""
+    payload, headers = json_responses.encode(body, request.headers.get('Accept-Encoding'))
+    return Response(payload, status=status, headers=headers)
+
+async def run_in_scoring_pool(handler, data):
+    """Run a slip handler on the scoring pool against a copy of the session"""
+    state = dict(session)
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(scoring_executor, handler, data, state)
+    session.update(state)
+    return json_response(body, status)
+
+async def run_query(handler):
+    """Run a GET query handler on the scoring pool; SQLite reads and odds reloads block"""
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(scoring_executor, handler, request.args.to_dict())
+    return json_response(body, status)
+
+async def request_data():
+    return await request.get_json(silent=True) or {}
+
+# Index the Flutter web build once at startup (see static_assets.py)
+static_index = StaticIndex('flutter_tsipster/build/web')
+
+# Load the odds, bet store and model (in the background with TSIPSTER_FAST_START)
+slips.start_engine()
+# Endpoints answered with 503 until the engine has loaded
+ENGINE_ENDPOINTS = {'generate_bets_api', 'accept_bets', 'reject_bets', 'get_replacement_bets',
+                    'get_same_match_alternatives', 'market_scan'}
+
+@app.before_request
+async def require_engine():
+    if request.endpoint in ENGINE_ENDPOINTS and not slips.engine_loaded():
+        return json_response({'error': 'Server is warming up, retry shortly'}, 503)
+
+@app.route('/healthz', methods=['GET'])
+async def healthz():
+    body, status = slips.health()
+    return json_response(body, status)
+
+@app.route('/readyz', methods=['GET'])
+async def readyz():
+    body, status = slips.readiness()
+    return json_response(body, status)
+
+@app.route('/', defaults={'path': ''})
+@app.route('/<path:path>')
+async def serve_flutter_app(path):
+    """Serve the Flutter web app for every path that is not an API endpoint"""
+    status, file_path, headers = static_index.resolve(
+        path, request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+    if status == 404:
+        abort(404)
+    mimetype = headers.pop('Content-Type')
+    if status == 304:
+        return Response(status=304, headers=headers)
+    response = await send_file(file_path, mimetype=mimetype, add_etags=False)
+    # Cache-Control from the index decides caching, not Quart's default expiry
+    response.headers.pop('Expires', None)
+    response.headers.update(headers)
+    return response
+
+@app.route('/api/generate-bets', methods=['POST'])
+async def generate_bets_api():
+    return await run_in_scoring_pool(slips.generate_bets, await request_data())
+
+@app.route('/accept_bets', methods=['POST'])
+async def accept_bets():
+    """Accept all bets; the model is trained in the background"""
+    body, status = slips.accept_bets(session, train=schedule_training)
+    return json_response(body, status)
+
+@app.route('/reject_bets', methods=['POST'])
+async def reject_bets():
+    """Reject selected bets; the model is trained in the background"""
+    body, status = slips.reject_bets(await request_data(), session, train=schedule_training)
+    return json_response(body, status)
+
+@app.route('/get_replacement_bets', methods=['POST'])
+async def get_replacement_bets():
+    return await run_in_scoring_pool(slips.get_replacement_bets, await request_data())
+
+@app.route('/get_same_match_alternatives', methods=['POST'])
+async def get_same_match_alternatives():
+    return await run_in_scoring_pool(slips.get_same_match_alternatives, await request_data())
+
+@app.route('/api/odds-history', methods=['GET'])
+async def odds_history_series():
+    return await run_query(odds_history.series_endpoint)
+
+@app.route('/api/odds-movers', methods=['GET'])
+async def odds_history_movers():
+    return await run_query(odds_history.movers_endpoint)
+
+@app.route('/api/market-scan', methods=['GET'])
+async def market_scan():
+    return await run_query(slips.market_scan)
+
+@app.route('/favicon.ico')
+async def favicon():
+    return await app.send_static_file('images/favicon.png')
+
+if __name__ == "__main__":
+    app.run(host='127.0.0.1', port=5000)
@@ -0,0 +1,248 @@
+"""Benchmark the slip-generation API against synthetic odds files.
+
+Synthesizes odds files in the scraper schema (match_title/markets/groups/outcomes)
+at the requested sizes, drives the Flask endpoints through the test client and
+reports p50/p99 latency, throughput and peak RSS per endpoint as JSON.
+
+Every size runs in its own subprocess so peak RSS is not shared between sizes,
+and the app is imported with the synthetic file as its only odds source, so
+import time and peak RSS cover the requested size. Importing the app with the
+repository's real odds is measured once more in a subprocess of its own.
+
+Usage:
+    python benchmarks/api_benchmark.py --sizes 10 100 1000 10000 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = ['generate_bets', 'get_replacement_bets', 'get_same_match_alternatives', 'accept_bets']
+
+# Teams and markets used to synthesize odds files (same spelling as the winmasters scraper output)
+TEAMS = ["Ρέιντζερς", "Αθλέτικ Μπιλμπάο", "Λιόν", "Μάντσεστερ Γιουνάιτεντ", "Τότεναμ",
+         "Άιντραχτ Φρανκφούρτης", "Μπόντο Γκλιμτ", "Λάτσιο", "Ρόμα", "Σοσιεδάδ"]
+GOAL_LINES = ["0.5", "1.5", "2.5", "3.5", "4.5", "5.5"]
+HANDICAP_LINES = ["-2.5", "-1.5", "-0.5", "+0.5", "+1.5", "+2.5"]
+
+
+def synthesize_match(index, rng, markets_per_match):
+    """Build one match object with a mix of 1X2, Over/Under, Goal-Goal and handicap markets"""
+    home = TEAMS[index % len(TEAMS)]
+    # Offset by 1..len(TEAMS) - 1 so a team never plays itself
+    away = TEAMS[(index + 1 + (index // len(TEAMS)) % (len(TEAMS) - 1)) % len(TEAMS)]
+    match_title = f"{home} vs {away} #{index}"
+
+    def odds(low=1.05, high=12.0):
+        return f"{rng.uniform(low, high):.2f}"
+
+    templates = [
+        lambda: {"market_name": "Τελικό Αποτέλεσμα", "groups": [{"group_title": None, "outcomes": [
+            {"outcome": home, "odds": odds(1.2, 6.0)},
+            {"outcome": "Ισοπαλία", "odds": odds(2.8, 4.5)},
+            {"outcome": away, "odds": odds(1.2, 6.0)}]}]},
+        lambda: {"market_name": "Γκολ Over/Under", "groups": [{"group_title": line, "outcomes": [
+            {"outcome": f"Over {line}", "odds": odds(1.05, 8.0)},
+            {"outcome": f"Under {line}", "odds": odds(1.05, 8.0)}]} for line in GOAL_LINES]},
+        lambda: {"market_name": "Να Σκοράρουν Και Οι Δύο Ομάδες", "groups": [{"group_title": None, "outcomes": [
+            {"outcome": "Ναι", "odds": odds(1.5, 2.5)},
+            {"outcome": "Όχι", "odds": odds(1.5, 2.5)}]}]},
+        lambda: {"market_name": "Χάντικαπ", "groups": [{"group_title": line, "outcomes": [
+            {"outcome": home, "odds": odds()},
+            {"outcome": "Ισοπαλία", "odds": odds()},
+            {"outcome": away, "odds": odds()}]} for line in HANDICAP_LINES]},
+        lambda: {"market_name": "Να Σκοράρει Οποιαδήποτε Στιγμή", "groups": [{"group_title": None, "outcomes": [
+            {"outcome": f"Παίκτης {player}", "odds": odds(1.8, 15.0)} for player in range(10)]}]},
+    ]
+    markets = [templates[m % len(templates)]() for m in range(markets_per_match)]
+    return {"match_title": match_title, "markets": markets}
+
+
+def synthesize_odds_file(path, num_matches, markets_per_match=5, seed=0):
+    """Write a synthetic odds file with num_matches matches and return the number of outcomes"""
+    rng = np.random.default_rng(seed)
+    matches = [synthesize_match(i, rng, markets_per_match) for i in range(num_matches)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(matches, f, ensure_ascii=False)
+    return sum(len(group['outcomes']) for match in matches for market in match['markets'] for group in market['groups'])
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(latencies, elapsed):
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def timed(client, path, payload, latencies):
+    start = time.perf_counter()
+    response = client.post(path, json=payload)
+    latencies.append(time.perf_counter() - start)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response.get_json()
+
+
+def run_single(num_matches, requests, markets_per_match, num_bets, seed):
+    """Benchmark all endpoints for one odds file size inside the current process"""
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, str(REPO_ROOT))
+    with tempfile.TemporaryDirectory() as workdir:
+        odds_path = os.path.join(workdir, 'odds.json')
+        num_outcomes = synthesize_odds_file(odds_path, num_matches, markets_per_match, seed)
+        # Keep the synthetic team names out of the real name cache
+        os.environ['TSIPSTER_NAME_CACHE'] = os.path.join(workdir, 'name_cache.json')
+        # Load the synthetic file, and only it, when the app is imported
+        os.environ['TSIPSTER_ODDS_FILE'] = odds_path
+
+        # The handlers print every request; keep the benchmark output clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            import app
+            import bet_suggestor
+            import_seconds = time.perf_counter() - start
+            # Never overwrite the real model while benchmarking accept_bets
+            bet_suggestor.model_file = Path(workdir) / 'nn_model.pth'
+
+            client = app.app.test_client()
+            generate_payload = {'numBets': num_bets, 'minOdds': 2.0, 'maxOdds': 15.0, 'seed': seed}
+            results = {}
+            latencies = {name: [] for name in ENDPOINTS}
+            elapsed = dict.fromkeys(ENDPOINTS, 0.0)
+
+            for i in range(requests):
+                generate_payload['seed'] = seed + i
+                start = time.perf_counter()
+                slip = timed(client, '/api/generate-bets', generate_payload, latencies['generate_bets'])
+                elapsed['generate_bets'] += time.perf_counter() - start
+                bets = slip['bets']
+                if not bets:
+                    continue
+
+                start = time.perf_counter()
+                timed(client, '/get_replacement_bets', {
+                    'num_needed': 1, 'min_odds': 2.0, 'max_odds': 15.0,
+                    'avoid_matches': [bets[0]['match']], 'seed': seed + i,
+                }, latencies['get_replacement_bets'])
+                elapsed['get_replacement_bets'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                timed(client, '/get_same_match_alternatives', {
+                    'target_matches': [bets[0]['match']], 'num_needed': 1,
+                    'rejected_bet_indices': [0], 'seed': seed + i,
+                }, latencies['get_same_match_alternatives'])
+                elapsed['get_same_match_alternatives'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                timed(client, '/accept_bets', {}, latencies['accept_bets'])
+                elapsed['accept_bets'] += time.perf_counter() - start
+
+            for name in ENDPOINTS:
+                if latencies[name]:
+                    results[name] = summarize(latencies[name], elapsed[name])
+
+    return {
+        'matches': num_matches,
+        'outcomes': num_outcomes,
+        'bets_loaded': len(bet_suggestor.bets),
+        'import_seconds': round(import_seconds, 3),
+        'endpoints': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_real_import():
+    """Import the app with the repository's own odds files and model, as a server starts"""
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, str(REPO_ROOT))
+    os.environ.pop('TSIPSTER_ODDS_FILE', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        import app
+        import bet_suggestor
+        import_seconds = time.perf_counter() - start
+    return {
+        'matches': bet_suggestor.max_unique_matches,
+        'bets_loaded': len(bet_suggestor.bets),
+        'import_seconds': round(import_seconds, 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Tsipster slip-generation API")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help="numbers of matches to synthesize")
+    parser.add_argument('--requests', type=int, default=50, help="request rounds per size")
+    parser.add_argument('--markets-per-match', type=int, default=5)
+    parser.add_argument('--num-bets', type=int, default=3, help="numBets sent to generate-bets")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--real-import', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.real_import:
+        print(json.dumps(run_real_import()))
+        return
+
+    if args.single:
+        result = run_single(args.sizes[0], args.requests, args.markets_per_match, args.num_bets, args.seed)
+        print(json.dumps(result))
+        return
+
+    report = {'python': sys.version.split()[0], 'requests_per_size': args.requests, 'runs': []}
+    for size in args.sizes:
+        print(f"Benchmarking {size} matches...", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), '--single', '--sizes', str(size),
+                   '--requests', str(args.requests), '--markets-per-match', str(args.markets_per_match),
+                   '--num-bets', str(args.num_bets), '--seed', str(args.seed)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            report['runs'].append({'matches': size, 'error': completed.stderr.strip().splitlines()[-1:]})
+            continue
+        report['runs'].append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--real-import'], capture_output=True, text=True)
+    if completed.returncode == 0:
+        report['real_data_import'] = json.loads(completed.stdout.strip().splitlines()[-1])
+    else:
+        report['real_data_import'] = {'error': completed.stderr.strip().splitlines()[-1:]}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
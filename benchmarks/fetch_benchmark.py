@@ -0,0 +1,113 @@
+"""Offline page-fetch throughput benchmark for the browserless HTTP backend.
+
+Serves the recorded fixture pages (benchmarks/fixtures.json, or --manifest)
+from a local replay server (scrapers/replay_server.py) at --pages distinct
+URLs with --latency ms per response and --connect-latency ms per new
+connection (the handshake a pool saves), then fetches them:
+- unpooled: a new connection per request, --connections at a time;
+- pooled: one http_fetcher.HttpFetcher (keep-alive pool, same concurrency);
+- revalidate: a second pass of the same HttpFetcher, whose conditional
+  requests are answered with 304 Not Modified.
+Reports pages/sec and MB received per pass as JSON.
+
+Usage:
+    python benchmarks/fetch_benchmark.py --pages 200 --connections 8 --latency 20 --connect-latency 60
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MANIFEST = Path(__file__).resolve().parent / 'fixtures.json'
+
+sys.path.insert(0, str(REPO_ROOT / 'scrapers'))
+
+import replay_server
+from http_fetcher import HttpFetcher
+
+
+def timed(name, pages, fetch_all):
+    start = time.perf_counter()
+    received = fetch_all()
+    elapsed = time.perf_counter() - start
+    return {'pass': name, 'pages': pages, 'seconds': round(elapsed, 3),
+            'pages_per_sec': round(pages / elapsed, 1), 'mb_received': round(received / 2**20, 2)}
+
+
+def fetch_unpooled(urls, connections):
+    def fetch(url):
+        # A fresh session per request: a new TCP connection every time, as without a pool
+        with requests.Session() as session:
+            response = session.get(url, headers={'Connection': 'close'}, timeout=30)
+            response.raise_for_status()
+            # Decoded like HttpFetcher does, so both passes do the same work per page
+            response.encoding = 'utf-8'
+            response.text
+            return len(response.content)
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        return sum(pool.map(fetch, urls))
+
+
+def fetch_pooled(fetcher, urls):
+    before = fetcher.stats['bytes']
+    for url, _, error in fetcher.fetch_many(urls):
+        if error is not None:
+            raise error
+    return fetcher.stats['bytes'] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled conditional HTTP fetching against a replay server")
+    parser.add_argument('--manifest', action='append', help="fixture manifest whose pages to serve (repeatable)")
+    parser.add_argument('--pages', type=int, default=200, help="distinct URLs to fetch per pass")
+    parser.add_argument('--connections', type=int, default=8, help="concurrent requests / pooled connections")
+    parser.add_argument('--latency', type=float, default=20.0, help="milliseconds the server waits before each response")
+    parser.add_argument('--connect-latency', type=float, default=60.0,
+                        help="milliseconds the server waits on each new connection")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    fixtures = {}
+    for manifest in args.manifest or [DEFAULT_MANIFEST]:
+        fixtures.update(replay_server.load_fixtures(manifest))
+    bodies = list(fixtures.values())
+    # Every URL is distinct, cycling through the recorded pages
+    responses = {f'/page/{index}': bodies[index % len(bodies)] for index in range(args.pages)}
+    server = replay_server.ReplayServer(responses, latency=args.latency / 1000,
+                                        connect_latency=args.connect_latency / 1000)
+    server.start()
+    urls = [f'{server.base_url}{path}' for path in responses]
+
+    fetcher = HttpFetcher(args.connections)
+    try:
+        passes = [
+            timed('unpooled', len(urls), lambda: fetch_unpooled(urls, args.connections)),
+            timed('pooled', len(urls), lambda: fetch_pooled(fetcher, urls)),
+            timed('revalidate', len(urls), lambda: fetch_pooled(fetcher, urls)),
+        ]
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+
+    report = {
+        'python': sys.version.split()[0], 'pages': args.pages, 'connections': args.connections,
+        'latency_ms': args.latency, 'connect_latency_ms': args.connect_latency,
+        'page_kb': [round(len(body.body) / 1024, 1) for body in bodies],
+        'not_modified': fetcher.stats['not_modified'], 'passes': passes,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Regression checks for the odds join and the market scan.
+
+Reads each odds file as a single source, both through odds_aggregation.iter_source
+(how bet_suggestor loads one file) and through aggregate, and checks that every
+outcome with valid odds comes out once, with its own price, in the source's
+order: one source must not merge lines or outcomes that merely share a name.
+Also scans a handicap market with two untitled lines, read alone and joined
+across two bookmakers, and checks that it stays two groups with no surebet:
+pooled, the best prices of different lines would look like one.
+Exits with status 1 when any check fails.
+
+Usage:
+    python benchmarks/join_check.py
+    python benchmarks/join_check.py --file odds/winmasters/UEL_odds.json --file odds/novibet/odds.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# The repository's own odds captures
+DEFAULT_FILES = [REPO_ROOT / 'odds' / 'winmasters' / 'UEL_odds.json',
+                 Path(__file__).resolve().parent / 'novibet_golden.json']
+
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def priced_outcomes(odds_data, parse_odds):
+    """(match, market, group, outcome, odds) of every outcome with valid odds, in order"""
+    return [(match['match_title'], market['market_name'], group['group_title'], outcome['outcome'], odds)
+            for match in odds_data for market in match['markets'] for group in market['groups']
+            for outcome in group['outcomes'] for odds in [parse_odds(outcome['odds'])] if odds is not None]
+
+
+def compare(label, source, output):
+    if len(output) != len(source):
+        return [f"{label}: {len(source)} priced outcomes in, {len(output)} out"]
+    return [f"{label}: {expected} came out as {actual}" for expected, actual in zip(source, output) if expected != actual][:10]
+
+
+def check_single_source(path):
+    """Failures of reading one odds file as a single source (an empty list when it passes)"""
+    from odds_aggregation import aggregate, iter_source, parse_odds
+    from odds_stream import iter_matches
+    source = priced_outcomes(iter_matches(str(path)), parse_odds)
+    streamed = priced_outcomes(iter_source(path.stem, iter_matches(str(path))), parse_odds)
+    joined = priced_outcomes(aggregate([(path.stem, iter_matches(str(path)))]), parse_odds)
+    return compare(f"{path} (iter_source)", source, streamed) + compare(f"{path} (aggregate)", source, joined)
+
+
+# Two untitled lines of one handicap market; each is a proper book (overround > 1),
+# but the best home price of one line and away price of the other sum below 1
+HANDICAP_LINES = {'match_title': 'Home vs Away', 'markets': [{'market_name': 'Ασιατικό Χάντικαπ', 'groups': [
+    {'group_title': None, 'outcomes': [{'outcome': 'Home', 'odds': '1.50'}, {'outcome': 'Away', 'odds': '2.60'}]},
+    {'group_title': None, 'outcomes': [{'outcome': 'Home', 'odds': '2.90'}, {'outcome': 'Away', 'odds': '1.40'}]},
+]}]}
+
+
+def check_scan_lines():
+    """Failures of scanning two untitled handicap lines (an empty list when it passes)"""
+    from market_scanner import MarketScan
+    from odds_aggregation import aggregate, iter_source
+    failures = []
+    for label, odds_data in (('single source', list(iter_source('a', [HANDICAP_LINES]))),
+                             ('joined', aggregate([('a', [HANDICAP_LINES]), ('b', [HANDICAP_LINES])]))):
+        scan = MarketScan(odds_data)
+        if len(scan.groups) != 2:
+            failures.append(f"handicap lines ({label}): scanned as {len(scan.groups)} groups, expected 2")
+        surebets = scan.query('surebets')
+        if surebets:
+            failures.append(f"handicap lines ({label}): false surebet {surebets[0]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that reading a single odds file keeps every bet and price")
+    parser.add_argument('--file', action='append', help="odds file to check (repeatable)")
+    args = parser.parse_args()
+
+    # Keep the spellings learned here out of the real name cache
+    os.environ['TSIPSTER_NAME_CACHE'] = os.path.join(tempfile.mkdtemp(), 'name_cache.json')
+    failures = []
+    for path in [Path(file) for file in args.file] if args.file else DEFAULT_FILES:
+        if not path.exists():
+            print(f"skipped {path}: not found")
+            continue
+        problems = check_single_source(path)
+        print(f"{'FAIL' if problems else 'ok'} single source {path}")
+        failures.extend(problems)
+    problems = check_scan_lines()
+    print(f"{'FAIL' if problems else 'ok'} untitled handicap lines scanned apart")
+    failures.extend(problems)
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
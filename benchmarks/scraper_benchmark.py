@@ -0,0 +1,130 @@
+"""Offline parse-throughput benchmark and regression check for the scrapers.
+
+Replays recorded page sources through the scrapers' parse_source functions,
+reports pages/sec, ms/market and peak memory per parse, and compares every
+parse against its golden JSON. Exits with status 1 when any output differs.
+
+Fixtures are listed in manifest files (paths relative to the manifest):
+    [{"scraper": "novibet", "page": "page.html", "golden": "output.json"},
+     {"scraper": "winmasters", "match_title": "A vs B", "page": "match_0.html", "golden": "match_0.json"}]
+
+Winmasters fixtures can be recorded with `python scrapers/winmasters_scraper.py --record DIR`.
+
+Usage:
+    python benchmarks/scraper_benchmark.py --repeat 20
+    python benchmarks/scraper_benchmark.py --manifest fixtures/winmasters/manifest.json --output parse.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MANIFEST = Path(__file__).resolve().parent / 'fixtures.json'
+
+sys.path.insert(0, str(REPO_ROOT / 'scrapers'))
+
+
+def load_parsers():
+    """Map scraper names to a callable (fixture, html) -> parsed output"""
+    import novibet_scraper
+    import stoiximan_scraper
+    import winmasters_scraper
+    return {
+        'novibet': lambda fixture, html: novibet_scraper.parse_source(html),
+        'stoiximan': lambda fixture, html: stoiximan_scraper.parse_source(html),
+        'winmasters': lambda fixture, html: winmasters_scraper.parse_source(fixture.get('match_title', 'Unknown Match'), html),
+    }
+
+
+def load_fixtures(manifest_paths):
+    fixtures = []
+    for manifest_path in manifest_paths:
+        manifest_path = Path(manifest_path)
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries:
+            fixture = dict(entry)
+            fixture['page'] = manifest_path.parent / entry['page']
+            fixture['golden'] = manifest_path.parent / entry['golden'] if entry.get('golden') else None
+            fixtures.append(fixture)
+    return fixtures
+
+
+def count_markets(output):
+    if output is None:
+        return 0
+    matches = output if isinstance(output, list) else [output]
+    return sum(len(match['markets']) for match in matches)
+
+
+def benchmark_fixture(parse, fixture, repeat):
+    with open(fixture['page'], 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    # The parsers print progress for every market; keep it out of the timings' output
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        output = parse(fixture, html)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(fixture, html)
+            durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    median = durations[len(durations) // 2]
+    markets = count_markets(output)
+    result = {
+        'scraper': fixture['scraper'],
+        'page': os.path.relpath(fixture['page'], REPO_ROOT),
+        'page_kb': round(len(html.encode('utf-8')) / 1024, 1),
+        'markets': markets,
+        'pages_per_sec': round(1.0 / median, 2) if median > 0 else None,
+        'ms_per_parse': round(median * 1000, 3),
+        'ms_per_market': round(median * 1000 / markets, 4) if markets else None,
+        'peak_parse_memory_mb': round(peak_bytes / (1024 * 1024), 2),
+    }
+
+    if fixture['golden'] is not None:
+        with open(fixture['golden'], 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+        result['matches_golden'] = output == golden
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper parsing against recorded pages")
+    parser.add_argument('--manifest', action='append', help="fixture manifest (repeatable)")
+    parser.add_argument('--repeat', type=int, default=10, help="timed parses per fixture")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    parsers = load_parsers()
+    fixtures = load_fixtures(args.manifest or [DEFAULT_MANIFEST])
+    results = [benchmark_fixture(parsers[fixture['scraper']], fixture, args.repeat) for fixture in fixtures]
+
+    report = {'python': sys.version.split()[0], 'repeat': args.repeat, 'fixtures': results}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    mismatches = [result['page'] for result in results if result.get('matches_golden') is False]
+    if mismatches:
+        print(f"Parse output differs from golden JSON for: {', '.join(mismatches)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
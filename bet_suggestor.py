@@ -1,10 +1,19 @@
+import gc
 import json
+import logging
 import math
-import random
-import torch
-import torch.nn as nn
-import torch.optim as optim
+import os
+import re
+import threading
+from functools import lru_cache
+import numpy as np
 from pathlib import Path
+from instrumentation import log_event, stage_timer
+from odds_aggregation import aggregate, iter_source
+from odds_stream import iter_matches
+from canonical_names import get_canonicalizer
+from market_scanner import MarketScan, ScanRows
+from nn_inference import init_weights, input_size_of, predict, read_weights, write_npz
 
 # Load user profile
 try:
@@ -25,31 +34,15 @@ except FileNotFoundError:
     }
     print("User profile not found, using default")
 
-# Load odds data
-try:
-    # Try to load winmasters data first
-    with open('odds/winmasters/UEL_odds.json', 'r', encoding='utf-8') as f:
-        odds_data = json.load(f)
-        print(f"Loaded winmasters odds data with {len(odds_data)} matches")
-except FileNotFoundError:
-    try:
-        # Fall back to bet365 data if available
-        with open('bet365_output.json', 'r', encoding='utf-8') as f:
-            odds_data = json.load(f)
-            print(f"Loaded bet365 odds data with {len(odds_data)} matches")
-    except FileNotFoundError:
-        odds_data = []
-        print("No odds data found! Make sure to run the winmasters scraper first.")
-
 # Define bet type categorization
-def get_bet_type(market_name, outcome=None):
+def get_bet_type(market_name, outcome=None, match=None):
     if "Over/Under" in market_name:
         return "Over/Under"
     elif "Να Σκοράρουν Και Οι Δύο Ομάδες" in market_name:
         return "Goal-Goal"
     elif "Τελικό Αποτέλεσμα" in market_name or "Αποτέλεσμα" in market_name:
-        # Check if it's a 1, X, 2 bet based on outcome
-        if outcome in ["Αθλέτικ Μπιλμπάο", "Ισοπαλία", "Ρόμα", "Μάντσεστερ Γιουνάιτεντ", "Σοσιεδάδ"]:
+        # A 1, X, 2 bet backs one of the match's teams or the draw
+        if outcome is not None and get_canonicalizer().is_team_or_draw(outcome, match):
             return "1X2"
         return "Final Result"
     elif "Χάντικαπ" in market_name:
@@ -58,89 +51,506 @@ def get_bet_type(market_name, outcome=None):
         return "Player-Specific"
     return "Other"
 
-# Define a simple neural network
-class BetPredictor(nn.Module):
-    def __init__(self, input_size):
-        super(BetPredictor, self).__init__()
-        self.fc1 = nn.Linear(input_size, 16)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(16, 1)
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.relu(x)
-        x = self.fc2(x)
-        x = self.sigmoid(x)
-        return x
-
-def get_bet_features(bet, market_types):
-    market_type = get_bet_type(bet['market'], bet['outcome'])
-    market_vector = [1 if mt == market_type else 0 for mt in market_types]
-    odds_normalized = (bet['odds'] - 1.0) / 999.0
-    return torch.tensor(market_vector + [odds_normalized], dtype=torch.float32)
-
 # Calculate preference score
 def calculate_bet_score(bet, user_profile):
-    market_type = get_bet_type(bet['market'], bet['outcome'])
+    market_type = get_bet_type(bet['market'], bet['outcome'], bet.get('match'))
     return user_profile['preferences'].get(market_type, 1)
 
-# Collect unique match names to determine max possible bets
-unique_matches = set()
-for match in odds_data:
-    unique_matches.add(match['match_title'])
+market_types = ["Over/Under", "Goal-Goal", "Final Result", "1X2", "Handicap", "Player-Specific", "Other"]
+# Features after the market-type one-hot, in column order
+numeric_features = ["log_odds", "implied_probability", "line", "group_rank", "match_margin"]
+input_size = len(market_types) + len(numeric_features)
 
-# Get the max number of unique matches
-max_unique_matches = len(unique_matches)
-print(f"Maximum available unique matches: {max_unique_matches}")
+# Handicap groups are titled home:away ("0:2"); other lines are the first number of
+# the group title, or a decimal line in the market or outcome ("Over 2.5")
+HANDICAP_GROUP = re.compile(r'\s*(\d+)\s*:\s*(\d+)\s*')
+GROUP_LINE = re.compile(r'[-+]?\d+(?:[.,]\d+)?')
+DECIMAL_LINE = re.compile(r'[-+]?\d+[.,]\d+')
 
-# Collect bets with match information
-bets = []
-market_types = ["Over/Under", "Goal-Goal", "Final Result", "1X2", "Handicap", "Player-Specific", "Other"]
+@lru_cache(maxsize=65536)
+def get_line(group, market, outcome):
+    """Numeric line of a bet (goal line, handicap), 0 if it has none"""
+    handicap = HANDICAP_GROUP.fullmatch(group or '')
+    if handicap:
+        return float(int(handicap.group(2)) - int(handicap.group(1)))
+    for text, pattern in ((group, GROUP_LINE), (market, DECIMAL_LINE), (outcome, DECIMAL_LINE)):
+        found = pattern.search(text or '')
+        if found:
+            return float(found.group().replace(',', '.'))
+    return 0.0
 
-for match in odds_data:
-    match_title = match['match_title']
-    for market in match['markets']:
-        market_name = market['market_name']
-        for group in market['groups']:
-            group_title = group['group_title']
-            for outcome in group['outcomes']:
-                if outcome['odds'] != "N/A":
-                    try:
-                        odds = float(outcome['odds'])
-                        bet = {
-                            'match': match_title,
-                            'market': market_name,
-                            'group': group_title,
-                            'outcome': outcome['outcome'],
-                            'odds': odds
-                        }
-                        bet['preference_score'] = calculate_bet_score(bet, user_profile)
-                        bets.append(bet)
-                    except ValueError:
-                        print(f"Invalid odds value: {outcome['odds']}")
-
-# Initialize neural network
-input_size = len(market_types) + 1
-model = BetPredictor(input_size)
-optimizer = optim.Adam(model.parameters(), lr=0.01)
-criterion = nn.BCELoss()
+def group_ranks(order, groups):
+    """Rank of each position in `order` (sorted by group) within its group"""
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    return np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
 
-# Load saved model state if exists
+def build_feature_matrix(bet_list):
+    """Feature rows (float32, input_size columns) for a list of bets, computed for all of them at once.
+
+    Columns: market-type one-hot, log odds, implied probability, line, rank by
+    odds within the bet's group (0 favourite to 1 outsider) and the match's margin
+    (overround - 1 of its tightest group that forms a full book). Groups are the
+    snapshot's own (bet['group_id']), so untitled lines of a market stay apart.
+    """
+    count = len(bet_list)
+    matrix = np.zeros((count, input_size), dtype=np.float32)
+    if not count:
+        return matrix
+    type_ids = {market_type: i for i, market_type in enumerate(market_types)}
+    types = np.fromiter(
+        (type_ids[get_bet_type(bet['market'], bet['outcome'], bet.get('match'))] for bet in bet_list),
+        dtype=np.intp, count=count)
+    matrix[np.arange(count), types] = 1.0
+
+    odds = np.fromiter((bet['odds'] for bet in bet_list), dtype=np.float64, count=count)
+    implied = 1.0 / odds
+    line_values = np.fromiter(
+        (get_line(bet.get('group'), bet['market'], bet['outcome']) for bet in bet_list), dtype=np.float64, count=count)
+
+    group_ids, match_ids, group_matches = {}, {}, []
+    groups = np.empty(count, dtype=np.intp)
+    for i, bet in enumerate(bet_list):
+        # Bets from outside the snapshot fall back to their titles
+        key = bet.get('group_id', (bet['match'], bet['market'], bet.get('group')))
+        group_id = group_ids.get(key)
+        if group_id is None:
+            group_id = group_ids[key] = len(group_ids)
+            group_matches.append(match_ids.setdefault(bet['match'], len(match_ids)))
+        groups[i] = group_id
+    group_matches = np.asarray(group_matches, dtype=np.intp)
+    group_sizes = np.bincount(groups)
+    order = np.lexsort((odds, groups))
+    ranks = np.empty(count, dtype=np.float64)
+    ranks[order] = group_ranks(order, groups)
+    ranks /= np.maximum(group_sizes[groups] - 1, 1)
+
+    # Groups with overlapping outcomes (double chance, goal ranges) sum far above
+    # 1, so the margin is taken from the tightest full book of the match
+    overrounds = np.bincount(groups, weights=implied)
+    full_books = (group_sizes >= 2) & (overrounds >= 1.0)
+    tightest = np.full(len(match_ids), np.inf)
+    np.minimum.at(tightest, group_matches[full_books], overrounds[full_books])
+    margins = np.where(np.isfinite(tightest), tightest - 1.0, 0.0)
+
+    numeric = len(market_types)
+    matrix[:, numeric] = np.log(odds)
+    matrix[:, numeric + 1] = implied
+    matrix[:, numeric + 2] = line_values
+    matrix[:, numeric + 3] = ranks
+    matrix[:, numeric + 4] = margins[group_matches[groups]]
+    return matrix
+
+def get_bet_features(bet):
+    """Feature row of one bet: its row in the snapshot's feature matrix, or built alone if it left the snapshot"""
+    with score_lock:
+        snapshot_bets, snapshot_features = bets_by_match.get(bet['match'], ()), features
+    group = bet.get('group') or ''
+    for candidate in snapshot_bets:
+        if (candidate['market'] == bet['market'] and candidate['outcome'] == bet['outcome']
+                and (candidate['group'] or '') == group):
+            return snapshot_features[candidate['index']]
+    return build_feature_matrix([bet])[0]
+
+# Odds files of every bookmaker, in order of preference for naming; all that
+# exist are joined into one snapshot with the best price per outcome
+odds_sources = [
+    ('winmasters', 'odds/winmasters/UEL_odds.json'),
+    ('novibet', 'odds/novibet/odds.json'),
+    ('stoiximan', 'odds/stoiximan/odds.json'),
+    ('bet365', 'odds/bet365/odds.json'),
+]
+
+# Versions of the loaded odds snapshot and of the model weights; the score cache is keyed by both
+snapshot_version = 0
+model_version = 0
+# Explicit odds file passed to load_odds (None joins all odds_sources) and the
+# mtimes of the files the current snapshot was built from
+odds_path = None
+odds_mtimes = {}
+
+# Guards swapping the bet store against readers of the score cache
+score_lock = threading.Lock()
+# Guards the model weights while training or scoring
+model_lock = threading.Lock()
+score_cache = {'key': None, 'scores': None}
+
+# Candidate tables keep, for every match, all its bets by log-odds band of width
+# ODDS_BAND_WIDTH and its best CANDIDATES_PER_MATCH bets overall
+CANDIDATES_PER_MATCH = 8
+ODDS_BAND_WIDTH = 0.25
+candidate_cache = {'key': None, 'tables': None}
+# Per-match odds bounds of the snapshot, for checking slip parameters up front
+odds_bounds = None
+
+def build_bets(odds_data):
+    """Flatten the match/market/group/outcome tree into the bet list"""
+    bets = []
+    # Every source group gets its own id: several lines of a market can share a title (or have none)
+    group_id = -1
+    for match in odds_data:
+        match_title = match['match_title']
+        for market in match['markets']:
+            market_name = market['market_name']
+            for group in market['groups']:
+                group_title = group['group_title']
+                group_id += 1
+                for outcome in group['outcomes']:
+                    if outcome['odds'] != "N/A":
+                        try:
+                            odds = float(outcome['odds'])
+                            bet = {
+                                'index': len(bets),
+                                'match': match_title,
+                                'market': market_name,
+                                'group': group_title,
+                                'group_id': group_id,
+                                'outcome': outcome['outcome'],
+                                'odds': odds,
+                                'bookmaker': outcome.get('bookmaker', '')
+                            }
+                            bet['preference_score'] = calculate_bet_score(bet, user_profile)
+                            bets.append(bet)
+                        except ValueError:
+                            print(f"Invalid odds value: {outcome['odds']}")
+    return bets
+
+def source_files(path=None):
+    """(bookmaker, file) pairs to load: the given file, or every bookmaker's odds file"""
+    if path:
+        return [(Path(path).stem, path)]
+    return odds_sources
+
+def current_mtimes(path=None):
+    return {file: os.path.getmtime(file) for _, file in source_files(path) if os.path.exists(file)}
+
+def build_snapshot(path=None):
+    """Stream, join and flatten the odds files.
+
+    Returns (mtimes, match titles, bets, bets_by_match, features, market_scan).
+    Matches are decoded one at a time, so no source file is ever resident as a
+    whole parsed tree. With a single source (an explicit path, or only one
+    bookmaker's file present) each match is passed through as parsed (see
+    odds_aggregation.iter_source) and turned into bets and scan rows on its
+    own, so besides the bet store only one match's
+    tree is held at a time. Several sources have to be joined first: the merged
+    tree is held until the bets and scan rows are built from it, then dropped
+    before the feature matrix.
+    """
+    sources = []
+    mtimes = {}
+    counts = {}
+    for bookmaker, file in source_files(path):
+        try:
+            mtime = os.path.getmtime(file)
+            matches = iter_matches(file)
+        except FileNotFoundError:
+            continue
+        mtimes[file] = mtime
+        counts[file] = 0
+        sources.append((bookmaker, count_matches(matches, counts, file)))
+    if not sources:
+        print("No odds data found! Make sure to run the winmasters scraper first.")
+    match_titles = set()
+    rows = ScanRows()
+    if len(sources) == 1:
+        matches = iter_source(*sources[0])
+    else:
+        matches = aggregate(sources)
+    new_bets = build_bets(collect_rows(matches, match_titles, rows))
+    # Drop the merged tree of several sources before the features are built
+    del matches
+    for file, count in counts.items():
+        print(f"Loaded odds data from {file} with {count} matches")
+    new_bets_by_match = {}
+    for bet in new_bets:
+        new_bets_by_match.setdefault(bet['match'], []).append(bet)
+    with stage_timer('feature_build'):
+        new_features = build_feature_matrix(new_bets)
+    with stage_timer('market_scan'):
+        scan = MarketScan(rows)
+    return mtimes, match_titles, new_bets, new_bets_by_match, new_features, scan
+
+def collect_rows(matches, match_titles, rows):
+    """Pass the matches through, noting each title and collecting its scan rows"""
+    for match in matches:
+        match_titles.add(match['match_title'])
+        rows.add(match)
+        yield match
+
+def count_matches(matches, counts, file):
+    for match in matches:
+        counts[file] += 1
+        yield match
+
+def sorted_log_products(lows, highs):
+    """Cumulative sums of the log minimums in ascending order and of the log maximums in descending order"""
+    return np.cumsum(np.sort(np.log(lows))), np.cumsum(np.sort(np.log(highs))[::-1])
+
+def build_odds_bounds(matches_bets):
+    """Every match's lowest and highest odds, with their sorted cumulative log products.
+
+    low_products[n - 1] is the log of the lowest total odds n distinct matches
+    can make (their n smallest minimums) and high_products[n - 1] that of the highest.
+    """
+    titles = list(matches_bets)
+    count = len(titles)
+    lows = np.fromiter((min(bet['odds'] for bet in matches_bets[title]) for title in titles), dtype=np.float64, count=count)
+    highs = np.fromiter((max(bet['odds'] for bet in matches_bets[title]) for title in titles), dtype=np.float64, count=count)
+    low_products, high_products = sorted_log_products(lows, highs)
+    return {'positions': {title: i for i, title in enumerate(titles)}, 'lows': lows, 'highs': highs,
+            'low_products': low_products, 'high_products': high_products}
+
+def load_odds(path=None):
+    """Load and join the odds files and rebuild the bet store as a new snapshot"""
+    global odds_path, odds_mtimes, bets, bets_by_match, unique_matches, max_unique_matches, snapshot_version, features, market_scan, odds_bounds
+    # Building the snapshot allocates millions of acyclic objects; pause the cyclic
+    # collector rather than let it rescan them over and over
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        mtimes, new_unique_matches, new_bets, new_bets_by_match, new_features, scan = build_snapshot(path)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    bounds = build_odds_bounds(new_bets_by_match)
+
+    with score_lock:
+        odds_path = path
+        odds_mtimes = mtimes
+        unique_matches = new_unique_matches
+        max_unique_matches = len(new_unique_matches)
+        bets = new_bets
+        bets_by_match = new_bets_by_match
+        features = new_features
+        market_scan = scan
+        odds_bounds = bounds
+        snapshot_version += 1
+    print(f"Maximum available unique matches: {max_unique_matches}")
+
+def refresh_odds():
+    """Reload the odds snapshot if a scraper wrote, rewrote or removed an odds file.
+
+    A truncated or malformed file is logged and the current snapshot kept; its
+    mtimes are still recorded, so it is not parsed again until it is rewritten.
+    """
+    global odds_mtimes
+    mtimes = current_mtimes(odds_path)
+    if mtimes == odds_mtimes:
+        return
+    try:
+        load_odds(odds_path)
+    except (ValueError, KeyError, TypeError) as e:
+        log_event('odds_reload_failed', logging.ERROR, files=sorted(mtimes), error=repr(e),
+                  action='keeping the previous snapshot until the file changes again')
+        with score_lock:
+            odds_mtimes = mtimes
+
+# TSIPSTER_ODDS_FILE serves a single odds file instead of joining odds_sources
+load_odds(os.environ.get('TSIPSTER_ODDS_FILE'))
+
+# Model weights as NumPy arrays, scored with nn_inference.predict; torch is only
+# imported (through nn_training) by a process the first time it trains
 model_file = Path('nn_model.pth')
-if model_file.exists():
+model_mtime = None
+weights = init_weights(input_size)
+trainer = None
+
+def weights_file():
+    """The weights exported next to model_file for processes that only score"""
+    return model_file.with_suffix('.npz')
+
+def saved_model():
+    """(mtime, path) of the newest saved weights file, (None, None) if there is none"""
+    saved = [(os.path.getmtime(path), path) for path in (weights_file(), model_file) if path.exists()]
+    return max(saved) if saved else (None, None)
+
+def read_model(path):
+    """Saved weights, or None (logged as a warning) if they were trained on a different feature layout"""
+    state = read_weights(path)
+    saved_size = input_size_of(state)
+    if saved_size != input_size:
+        log_event('model_feature_mismatch', logging.WARNING, path=str(path), saved_inputs=saved_size,
+                  expected_inputs=input_size, action='serving untrained weights until the next save replaces the file')
+        return None
+    return state
+
+# Load saved model state if exists
+model_mtime, saved_path = saved_model()
+if saved_path is not None:
     try:
-        model.load_state_dict(torch.load(model_file))
-        print("Loaded saved neural network state.")
+        state = read_model(saved_path)
+        # Weights for an older feature layout are skipped (and replaced on the next save)
+        if state is not None:
+            weights = state
+            print("Loaded saved neural network state.")
     except Exception as e:
         print(f"Error loading model: {e}")
 else:
     print("No saved model found. Starting with a fresh neural network.")
 
-model.eval()
+def compute_nn_scores(feature_matrix):
+    """Run the network over a feature matrix in one batch"""
+    if not len(feature_matrix):
+        return np.zeros(0, dtype=np.float32)
+    with stage_timer('inference'), model_lock:
+        return predict(weights, feature_matrix)
+
+def current_scores():
+    """NN scores for the current versions, recomputed if stale; the caller holds score_lock"""
+    key = (model_version, snapshot_version)
+    if score_cache['key'] != key:
+        score_cache['scores'] = compute_nn_scores(features)
+        score_cache['key'] = key
+    return score_cache['scores']
+
+def get_scored_bets():
+    """Return the bet store with the NN score of every bet (indexed by bet['index']).
+
+    Scores are cached for the current (model version, snapshot version) pair, so
+    inference only runs again after training or after the odds file changes.
+    """
+    with score_lock:
+        return bets, current_scores()
+
+def odds_band(odds):
+    return math.floor(math.log(max(odds, 1.0)) / ODDS_BAND_WIDTH)
+
+def top_per_group(order, groups, k):
+    """Positions in `order` (sorted by group) that rank among the first k of their group"""
+    return order[group_ranks(order, groups) < k]
+
+def build_candidate_tables(bet_list, nn_scores):
+    """Per match: all its bets, the same bets by log-odds band and its top candidates overall.
+
+    Bands keep every bet (the tables only hold references), so a lookup sees all
+    the in-range bets a full scan would. The overall top is ranked by
+    preference * NN score, the score selection jitters.
+    """
+    tables = {}
+    if not bet_list:
+        return tables
+    count = len(bet_list)
+    match_ids = {}
+    matches = np.fromiter((match_ids.setdefault(bet['match'], len(match_ids)) for bet in bet_list), dtype=np.intp, count=count)
+    odds = np.fromiter((bet['odds'] for bet in bet_list), dtype=np.float64, count=count)
+    preferences = np.fromiter((bet['preference_score'] for bet in bet_list), dtype=np.float64, count=count)
+    base_scores = preferences * nn_scores
+    bands = np.floor(np.log(np.maximum(odds, 1.0)) / ODDS_BAND_WIDTH).astype(np.intp)
+
+    for match, match_bets in bets_by_match.items():
+        tables[match] = {'bets': match_bets, 'bands': {}, 'top': []}
+
+    for bet, band in zip(bet_list, bands.tolist()):
+        tables[bet['match']]['bands'].setdefault(band, []).append(bet)
+    # Sort by match, then descending score and keep the head of each match
+    for i in top_per_group(np.lexsort((-base_scores, matches)), matches, CANDIDATES_PER_MATCH):
+        bet = bet_list[i]
+        tables[bet['match']]['top'].append(bet)
+    return tables
+
+def get_candidate_tables():
+    """Return the NN scores and per-match candidate tables for the current versions.
+
+    Tables are rebuilt together with the score cache, so replacement lookups read
+    a few precomputed candidates per match instead of rescoring every bet.
+    """
+    with score_lock:
+        key = (model_version, snapshot_version)
+        scores = current_scores()
+        if candidate_cache['key'] != key:
+            with stage_timer('candidate_tables'):
+                candidate_cache['tables'] = build_candidate_tables(bets, scores)
+            candidate_cache['key'] = key
+        return scores, candidate_cache['tables']
+
+def lookup_candidates(tables, low, high, exclude=()):
+    """Table candidates with odds in [low, high] from every match not in exclude"""
+    first, last = odds_band(low), odds_band(high)
+    candidates = []
+    for match, table in tables.items():
+        if match in exclude:
+            continue
+        match_bands = table['bands']
+        for band in range(first, last + 1):
+            band_bets = match_bands.get(band)
+            if band_bets:
+                candidates.extend(bet for bet in band_bets if low <= bet['odds'] <= high)
+    return candidates
+
+def lookup_best(tables, exclude=()):
+    """Top table candidates, whatever their odds, from every match not in exclude"""
+    candidates = []
+    for match, table in tables.items():
+        if match not in exclude:
+            candidates.extend(table['top'])
+    return candidates
+
+def refresh_model():
+    """Reload the weights if another worker process saved newer ones"""
+    global model_version, model_mtime, weights
+    mtime, path = saved_model()
+    if path is None or mtime == model_mtime:
+        return
+    with model_lock:
+        try:
+            state = read_model(path)
+        except Exception as e:
+            print(f"Error reloading model: {e}")
+            return
+        model_mtime = mtime
+        if state is None:
+            return
+        weights = state
+        model_version += 1
+
+def refresh():
+    """Pick up odds and model files rewritten by the scraper or by other workers"""
+    refresh_odds()
+    refresh_model()
+
+def save_model():
+    """Write the weights as a torch state dict and as the .npz export, each atomically.
+
+    The export is written last, so processes watching it never see it older than the .pth.
+    """
+    global model_mtime
+    trainer.save(model_file)
+    write_npz(weights, weights_file())
+    model_mtime, _ = saved_model()
+
+def train_model(bet_list, label):
+    """Train the network on bets sharing one label (1.0 accepted, 0.0 rejected) and save it"""
+    global model_version, weights, trainer
+    if not bet_list:
+        return
+    refresh_model()
+    rows = [get_bet_features(bet) for bet in bet_list]
+    with stage_timer('train_step'), model_lock:
+        if trainer is None:
+            from nn_training import Trainer
+            trainer = Trainer(input_size)
+        weights = trainer.train(weights, rows, label)
+        save_model()
+        model_version += 1
+    # Recompute the score cache and candidate tables in the background so the next request skips them
+    threading.Thread(target=get_candidate_tables).start()
+
+def score_candidates(candidates, nn_scores, rng):
+    """Score a batch of candidate bets as preference * NN score.
+
+    Each bet has a 20% chance of a random 0.8-1.2 jitter, drawn as one vector
+    for the whole batch.
+    """
+    count = len(candidates)
+    indices = np.fromiter((bet['index'] for bet in candidates), dtype=np.intp, count=count)
+    preferences = np.fromiter((bet['preference_score'] for bet in candidates), dtype=np.float64, count=count)
+    scores = preferences * nn_scores[indices]
+    jitter = np.where(rng.random(count) < 0.2, rng.uniform(0.8, 1.2, count), 1.0)
+    return scores * jitter
 
 # Function to calculate dynamic odds range
-def get_next_odds_range(current_total_odds, bets_selected, total_bets, min_total_odds, max_total_odds):
+def get_next_odds_range(current_total_odds, bets_selected, total_bets, min_total_odds, max_total_odds, rng=None):
     remaining_bets = total_bets - bets_selected
     if remaining_bets <= 0:
         return 1.01, 1000.0  # Default wide range if no bets remain
@@ -155,7 +565,9 @@ def get_next_odds_range(current_total_odds, bets_selected, total_bets, min_total
     high = min(1000.0, high + widen_factor)
     
     # With 10% probability, allow higher odds (e.g., up to 2.1)
-    if random.random() < 0.1:
+    if rng is None:
+        rng = np.random.default_rng()
+    if rng.random() < 0.1:
         low = max(1.01, low * 0.9)
         high = min(1000.0, high * 1.2)  # Allows odds up to ~2.1 or more
     
@@ -163,4 +575,54 @@ def get_next_odds_range(current_total_odds, bets_selected, total_bets, min_total
 
 # Function to get available unique matches count
 def get_max_unique_matches():
-    return max_unique_matches
\ No newline at end of file
+    return max_unique_matches
+
+def bound_products(bounds, exclude=()):
+    """The snapshot's sorted cumulative log products, without the matches in exclude"""
+    positions = bounds['positions']
+    excluded = [positions[match] for match in exclude if match in positions]
+    if not excluded:
+        return bounds['low_products'], bounds['high_products']
+    keep = np.ones(len(bounds['lows']), dtype=bool)
+    keep[excluded] = False
+    return sorted_log_products(bounds['lows'][keep], bounds['highs'][keep])
+
+def plan_slip(num_bets, min_total_odds, max_total_odds, unique_match_only=True, used=(), avoid=(), current_total_odds=1.0):
+    """Check slip parameters against the snapshot's odds bounds before any bet is selected.
+
+    num_bets more bets are added to a slip at current_total_odds. With
+    unique_match_only they come from matches not in used while any remain, the
+    rest (or all of them otherwise) from matches not in avoid. Returns a dict:
+    - 'unique_bets': how many of the bets can come from distinct unused matches;
+    - 'achievable': the (lowest, highest) total odds the slip can reach, None without bets;
+    - 'feasible': whether that range meets [min_total_odds, max_total_odds];
+    - 'target': the window to aim for, the requested one clipped to the achievable
+      range, or the achievable end nearest to it when they do not meet.
+    """
+    bounds = odds_bounds
+    unique_bets = 0
+    log_low = log_high = 0.0
+    if unique_match_only:
+        low_products, high_products = bound_products(bounds, used)
+        unique_bets = min(num_bets, len(low_products))
+        if unique_bets:
+            log_low, log_high = low_products[unique_bets - 1], high_products[unique_bets - 1]
+    duplicates = num_bets - unique_bets
+    if duplicates > 0:
+        # Past the distinct matches, a slip can at best repeat the extreme bet
+        low_products, high_products = bound_products(bounds, avoid)
+        if not len(low_products):
+            return {'unique_bets': unique_bets, 'achievable': None, 'feasible': False,
+                    'target': (min_total_odds, max_total_odds)}
+        log_low += duplicates * low_products[0]
+        log_high += duplicates * high_products[0]
+    low = current_total_odds * math.exp(log_low)
+    high = current_total_odds * math.exp(log_high)
+    feasible = low <= max_total_odds and min_total_odds <= high
+    if feasible:
+        target = (max(min_total_odds, low), min(max_total_odds, high))
+    elif high < min_total_odds:
+        target = (high, high)
+    else:
+        target = (low, low)
+    return {'unique_bets': unique_bets, 'achievable': (low, high), 'feasible': feasible, 'target': target}
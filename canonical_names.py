@@ -0,0 +1,249 @@
+"""Canonical team, market and outcome names across bookmakers.
+
+Bookmakers spell the same thing differently: accents, emoji ("Τελικό
+Αποτέλεσμα 🚀"), Latin letters mixed into Greek words, English or transliterated
+team names. Every name is first normalized, then resolved to a canonical name:
+
+1. through the alias table (profile/name_aliases.json) and every mapping
+   resolved before, which is a dict lookup;
+2. on a miss, through a trigram index of the canonical names and aliases,
+   accepting the most similar spelling above a threshold whose numbers (lines,
+   handicaps) are identical and which the same bookmaker does not already use
+   (a bookmaker never lists one market under two spellings);
+3. failing that, the name becomes a canonical name itself.
+
+Mappings found by steps 2 and 3 are kept in a persistent cache
+(odds/name_cache.json, or TSIPSTER_NAME_CACHE), so each new spelling costs one
+fuzzy search ever, and resolving the names of a whole scrape is hash lookups.
+"""
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+ALIASES_FILE = 'profile/name_aliases.json'
+DEFAULT_CACHE_FILE = 'odds/name_cache.json'
+
+# Minimum trigram (Dice) similarity for a fuzzy match, per kind of name
+THRESHOLDS = {'teams': 0.7, 'markets': 0.8, 'outcomes': 0.9}
+
+# Canonical name of the draw outcome in the alias table
+DRAW = 'Ισοπαλία'
+
+# Separators between home and away team in match titles
+MATCH_SEPARATOR = re.compile(r'\s+(?:vs\.?|v|-|–)\s+', re.IGNORECASE)
+# Anything that is not a letter, digit or a character that changes a line's meaning
+NAME_NOISE = re.compile(r'[^\w\s.+\-/,]', re.UNICODE)
+WHITESPACE = re.compile(r'\s+')
+# Decimal commas in lines ("Under 3,5") are written as points
+DECIMAL_COMMA = re.compile(r'(?<=\d),(?=\d)')
+NUMBERS = re.compile(r'\d+(?:\.\d+)?')
+GREEK_WORD = re.compile(r'\w*[α-ω]\w*')
+
+# Latin letters that look like Greek ones, as typed into Greek words ("Nα σκοράρουν")
+LATIN_HOMOGLYPHS = str.maketrans('abehikmnoptxyz', 'αβεηικμνοπτχυζ')
+# Greek to Latin, so Greek and transliterated spellings share trigrams
+TRANSLITERATION = str.maketrans({
+    'α': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'i', 'θ': 'th',
+    'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p',
+    'ρ': 'r', 'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y', 'φ': 'f', 'χ': 'ch', 'ψ': 'ps', 'ω': 'o',
+})
+
+@lru_cache(maxsize=65536)
+def normalize_name(name):
+    """Normalized form of a name: accents, case, emoji and extra spacing removed"""
+    if name is None:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    stripped = DECIMAL_COMMA.sub('.', ''.join(ch for ch in decomposed if not unicodedata.combining(ch)))
+    cleaned = WHITESPACE.sub(' ', NAME_NOISE.sub(' ', stripped.casefold())).strip()
+    return GREEK_WORD.sub(lambda word: word.group().translate(LATIN_HOMOGLYPHS), cleaned)
+
+def split_match(match_title):
+    """Home and away team of a match title (one element if there is no separator)"""
+    return MATCH_SEPARATOR.split(match_title or '', maxsplit=1)
+
+def trigrams(key):
+    padded = f'  {key.translate(TRANSLITERATION)} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def number_signature(key):
+    return tuple(NUMBERS.findall(key))
+
+
+class NameIndex:
+    """Canonical names of one kind: exact mappings plus a trigram index for fuzzy lookup.
+
+    The trigram index is partitioned by the numbers in each name, since a fuzzy
+    match must carry the same numbers ("Over 2.5" never matches "Over 3.5").
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.exact = {}      # normalized name -> canonical name
+        self.resolved = {}   # raw spelling -> canonical name, skipping normalization on repeats
+        self.sources = {}    # canonical name -> sources seen using it
+        self.learned = {}    # mappings found by fuzzy search or registration, for the cache
+        self.canonicals = set()
+        self.entries = []     # (canonical name, trigram count) per indexed spelling
+        self.gram_index = {}  # number signature -> trigram -> entry ids
+        self.lock = threading.Lock()
+
+    def index_spelling(self, key, canonical):
+        """Make a normalized spelling findable by fuzzy search"""
+        grams = trigrams(key)
+        entry_id = len(self.entries)
+        self.entries.append((canonical, len(grams)))
+        postings = self.gram_index.setdefault(number_signature(key), {})
+        for gram in grams:
+            postings.setdefault(gram, []).append(entry_id)
+
+    def add_canonical(self, canonical):
+        if canonical in self.canonicals:
+            return
+        self.canonicals.add(canonical)
+        key = normalize_name(canonical)
+        self.index_spelling(key, canonical)
+        self.exact.setdefault(key, canonical)
+
+    def add(self, canonical, aliases=()):
+        """Register a canonical name and its aliases"""
+        self.add_canonical(canonical)
+        for alias in aliases:
+            key = normalize_name(alias)
+            self.exact[key] = canonical
+            self.index_spelling(key, canonical)
+
+    def lookup(self, name):
+        """Canonical name from the alias table and earlier resolutions, without fuzzy search"""
+        canonical = self.resolved.get(name)
+        if canonical is None:
+            canonical = self.exact.get(normalize_name(name))
+            if canonical is not None:
+                self.resolved[name] = canonical
+        return canonical
+
+    def fuzzy_match(self, key, source=None):
+        """Canonical name of the most similar known spelling with the same numbers, or None below the threshold"""
+        grams = trigrams(key)
+        postings = self.gram_index.get(number_signature(key), {})
+        shared = Counter()
+        for gram in grams:
+            shared.update(postings.get(gram, ()))
+        best, best_score = None, self.threshold
+        for entry_id, count in shared.items():
+            canonical, size = self.entries[entry_id]
+            score = 2.0 * count / (len(grams) + size)
+            if score >= best_score and source not in self.sources.get(canonical, ()):
+                best, best_score = canonical, score
+        return best
+
+    def resolve(self, name, source=None):
+        """Canonical name for any spelling, registering names that match nothing known"""
+        canonical = self.resolved.get(name)
+        if canonical is not None:
+            return canonical
+        key = normalize_name(name)
+        with self.lock:
+            canonical = self.exact.get(key)
+            if canonical is None:
+                canonical = self.fuzzy_match(key, source)
+                if canonical is None:
+                    canonical = name
+                    self.add_canonical(canonical)
+                self.exact[key] = canonical
+                self.learned[key] = canonical
+            if source is not None:
+                self.sources.setdefault(canonical, set()).add(source)
+            self.resolved[name] = canonical
+            return canonical
+
+
+class Canonicalizer:
+    """Name indexes for teams, markets and outcomes, seeded from aliases and the cache"""
+
+    def __init__(self, aliases_file=ALIASES_FILE, cache_file=None):
+        self.cache_file = cache_file or os.environ.get('TSIPSTER_NAME_CACHE', DEFAULT_CACHE_FILE)
+        self.indexes = {kind: NameIndex(threshold) for kind, threshold in THRESHOLDS.items()}
+        self.saved_sizes = {kind: 0 for kind in THRESHOLDS}
+        # raw outcome -> (size of the team index when resolved, team it names, canonical outcome)
+        self.outcome_cache = {}
+        for kind, table in read_json(aliases_file).items():
+            for canonical, aliases in table.items():
+                self.indexes[kind].add(canonical, aliases)
+        for kind, mappings in read_json(self.cache_file).items():
+            index = self.indexes[kind]
+            for key, canonical in mappings.items():
+                index.add_canonical(canonical)
+                index.exact.setdefault(key, canonical)
+                index.learned[key] = canonical
+            self.saved_sizes[kind] = len(index.learned)
+
+    @property
+    def teams(self):
+        return self.indexes['teams']
+
+    @property
+    def markets(self):
+        return self.indexes['markets']
+
+    @property
+    def outcomes(self):
+        return self.indexes['outcomes']
+
+    def match(self, match_title, source=None):
+        """Canonical (home, away) of a match title"""
+        return tuple(self.teams.resolve(team, source) for team in split_match(match_title))
+
+    def outcome(self, outcome, teams=(), source=None):
+        """Canonical outcome; outcomes naming one of the match's teams resolve to that team"""
+        teams_size = len(self.teams.exact)
+        cached = self.outcome_cache.get(outcome)
+        if cached is None or cached[0] != teams_size:
+            cached = self.outcome_cache[outcome] = (teams_size, self.teams.lookup(outcome), self.outcomes.resolve(outcome, source))
+        _, team, canonical = cached
+        return team if team is not None and team in teams else canonical
+
+    def is_team_or_draw(self, outcome, match_title):
+        """True if an outcome backs one of the match's teams or the draw, without fuzzy search"""
+        team = self.teams.lookup(outcome) or outcome
+        teams = [self.teams.lookup(name) or name for name in split_match(match_title)]
+        if normalize_name(team) in {normalize_name(name) for name in teams}:
+            return True
+        return self.outcomes.lookup(outcome) == DRAW
+
+    def save(self):
+        """Write the learned mappings if any were added since loading (atomically)"""
+        if all(len(index.learned) == self.saved_sizes[kind] for kind, index in self.indexes.items()):
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {kind: dict(index.learned) for kind, index in self.indexes.items()}
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, self.cache_file)
+        self.saved_sizes = {kind: len(mappings) for kind, mappings in data.items()}
+
+def read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+# Shared instance, loaded on first use
+canonicalizer = None
+canonicalizer_lock = threading.Lock()
+
+def get_canonicalizer():
+    global canonicalizer
+    if canonicalizer is None:
+        with canonicalizer_lock:
+            if canonicalizer is None:
+                canonicalizer = Canonicalizer()
+    return canonicalizer
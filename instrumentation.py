@@ -0,0 +1,223 @@
+"""Request timing, Prometheus-style metrics and structured logging for the Tsipster API.
+
+Stage timers (filter, feature_build, inference, selection, session_write,
+train_step) and per-endpoint request timings are aggregated into histograms and
+rendered at /metrics (init_app for Flask, init_async_app for Quart). Log records are JSON lines written by a background
+listener thread, so handlers never block on stdout; full request/response
+payloads are only logged for a sampled fraction of requests.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fraction of requests whose full payloads are logged
+PAYLOAD_SAMPLE_RATE = float(os.environ.get('TSIPSTER_PAYLOAD_SAMPLE_RATE', '0.01'))
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, safe to update from several threads"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.total += value
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.count, self.total
+
+# Histograms and counters keyed by (metric name, label tuple)
+histograms = {}
+counters = {}
+metric_help = {
+    'tsipster_stage_seconds': 'Time spent in each stage of request handling',
+    'tsipster_request_seconds': 'Total request handling time per endpoint',
+    'tsipster_requests_total': 'Requests handled per endpoint and status code',
+}
+registry_lock = threading.Lock()
+
+def get_histogram(name, labels):
+    key = (name, labels)
+    histogram = histograms.get(key)
+    if histogram is None:
+        with registry_lock:
+            histogram = histograms.setdefault(key, Histogram())
+    return histogram
+
+def increment(name, labels, amount=1):
+    with registry_lock:
+        counters[(name, labels)] = counters.get((name, labels), 0) + amount
+
+def observe_stage(stage, seconds):
+    get_histogram('tsipster_stage_seconds', (('stage', stage),)).observe(seconds)
+
+@contextmanager
+def stage_timer(stage):
+    """Time the enclosed block into the histogram for the given stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+def render_metrics():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    with registry_lock:
+        histogram_items = sorted(histograms.items())
+        counter_items = sorted(counters.items())
+
+    seen = set()
+    for (name, labels), histogram in histogram_items:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {metric_help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        counts, count, total = histogram.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {total}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+    for (name, labels), value in counter_items:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {metric_help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+logger = logging.getLogger('tsipster')
+
+def setup_logging(level=logging.INFO):
+    """Send the tsipster logger through a queue drained by a background thread.
+
+    Call again in forked worker processes: the listener thread does not survive fork.
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+
+def default_log_level():
+    return getattr(logging, os.environ.get('TSIPSTER_LOG_LEVEL', 'INFO').upper(), logging.INFO)
+
+setup_logging(default_log_level())
+
+def log_event(event, level=logging.INFO, **fields):
+    """Log a structured event; keyword arguments become JSON fields"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+def log_payload(event, payload, **fields):
+    """Log a full request/response payload for a sampled fraction of calls"""
+    if random.random() < PAYLOAD_SAMPLE_RATE:
+        log_event(event, payload=payload, **fields)
+
+def init_app(app):
+    """Time every request and expose the collected metrics at /metrics"""
+    from flask import Response, g, request
+    from flask.sessions import SecureCookieSessionInterface
+
+    class TimedSessionInterface(SecureCookieSessionInterface):
+        def save_session(self, app, session, response):
+            with stage_timer('session_write'):
+                return super().save_session(app, session, response)
+
+    app.session_interface = TimedSessionInterface()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_time(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unknown'
+            get_histogram('tsipster_request_seconds', (('endpoint', endpoint),)).observe(time.perf_counter() - start)
+            increment('tsipster_requests_total', (('endpoint', endpoint), ('status', response.status_code)))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def init_async_app(app):
+    """Same as init_app for the Quart (asyncio) variant of the API"""
+    from quart import Response, g, request
+    from quart.sessions import SecureCookieSessionInterface
+
+    class TimedSessionInterface(SecureCookieSessionInterface):
+        async def save_session(self, app, session, response):
+            with stage_timer('session_write'):
+                return await super().save_session(app, session, response)
+
+    app.session_interface = TimedSessionInterface()
+
+    @app.before_request
+    async def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    async def record_request_time(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unknown'
+            get_histogram('tsipster_request_seconds', (('endpoint', endpoint),)).observe(time.perf_counter() - start)
+            increment('tsipster_requests_total', (('endpoint', endpoint), ('status', response.status_code)))
+        return response
+
+    @app.route('/metrics')
+    async def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
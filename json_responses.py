@@ -0,0 +1,51 @@
+"""Compact, compressed JSON bodies for the API endpoints.
+
+Payloads are serialized with orjson when it is installed (falling back to the
+standard library with compact separators and raw UTF-8, so Greek match/market
+names are not escaped to \\uXXXX) and compressed with brotli or gzip when the
+client accepts it and the body is large enough to be worth it. Both app.py and
+app_async.py build their responses through encode().
+"""
+import gzip
+import json
+
+from static_assets import accepted_encodings, brotli
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies below this size go out uncompressed
+MIN_COMPRESS_SIZE = 1024
+# Dynamic responses favour speed over ratio
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def dumps(obj):
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def compress(payload, accept_encoding):
+    """Compress a payload with the best encoding the client accepts.
+
+    Returns (payload, encoding); encoding is None when the payload is sent as is.
+    """
+    if len(payload) < MIN_COMPRESS_SIZE:
+        return payload, None
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        return brotli.compress(payload, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in encodings:
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+    return payload, None
+
+def encode(body, accept_encoding=None):
+    """Serialize and compress a response body; returns (payload, headers)"""
+    payload, encoding = compress(dumps(body), accept_encoding)
+    headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    return payload, headers
@@ -0,0 +1,181 @@
+"""Overround, surebet and value scan over a joined odds snapshot.
+
+Runs once per snapshot (bet_suggestor builds it with the bet store) over every
+bookmaker price in the merged odds data (see odds_aggregation.py), with all
+per-group and per-bookmaker sums done as NumPy bincounts:
+
+- overround: sum of 1/odds over a group's outcomes, for each bookmaker quoting
+  the whole group and for the best available price of every outcome. Only
+  groups that at least one bookmaker prices as a full book (overround >= 1)
+  are scanned, which keeps out groups with missing or overlapping outcomes;
+- surebets: groups whose best prices add up to less than 1, so backing every
+  outcome across bookmakers returns a profit;
+- value: prices above the consensus fair price, which is the mean of the
+  margin-free probabilities of every bookmaker quoting the whole group.
+
+Queries then only filter and slice the precomputed results.
+"""
+import numpy as np
+
+# Value bets need at least this many full books to form a consensus
+MIN_CONSENSUS_BOOKS = 2
+# Edge over the consensus fair price below which a price is not reported as value
+MIN_VALUE_EDGE = 0.0
+
+SCAN_KINDS = ('surebets', 'value', 'overround')
+
+
+class ScanRows:
+    """The rows a MarketScan is built from, collected one match at a time.
+
+    Only names and prices are kept, not the match dicts, so a snapshot read
+    match by match never has to be held as a whole for the scan.
+    """
+
+    def __init__(self, odds_data=()):
+        self.groups = []        # (match, market, group title)
+        self.outcome_names = []
+        self.best_books = []    # bookmaker of each outcome's best price
+        self.best_odds = []
+        self.outcome_groups = []
+        self.row_outcomes, self.row_books, self.row_odds = [], [], []
+        self.bookmakers = {}
+        for match in odds_data:
+            self.add(match)
+
+    def add(self, match):
+        groups, outcome_names, bookmakers = self.groups, self.outcome_names, self.bookmakers
+        for market in match['markets']:
+            for group in market['groups']:
+                group_id = len(groups)
+                groups.append((match['match_title'], market['market_name'], group['group_title']))
+                for outcome in group['outcomes']:
+                    outcome_id = len(outcome_names)
+                    outcome_names.append(outcome['outcome'])
+                    self.best_books.append(outcome.get('bookmaker', ''))
+                    self.best_odds.append(float(outcome['odds']))
+                    self.outcome_groups.append(group_id)
+                    prices = outcome.get('prices') or {outcome.get('bookmaker', ''): float(outcome['odds'])}
+                    for bookmaker, odds in prices.items():
+                        self.row_outcomes.append(outcome_id)
+                        self.row_books.append(bookmakers.setdefault(bookmaker, len(bookmakers)))
+                        self.row_odds.append(odds)
+
+
+class MarketScan:
+    """Precomputed scan results of one snapshot"""
+
+    def __init__(self, odds_data):
+        """odds_data is the joined matches, or ScanRows already collected from them"""
+        rows = odds_data if isinstance(odds_data, ScanRows) else ScanRows(odds_data)
+        groups, outcome_names, best_books = rows.groups, rows.outcome_names, rows.best_books
+        best_odds, outcome_groups, bookmakers = rows.best_odds, rows.outcome_groups, rows.bookmakers
+        row_outcomes, row_books, row_odds = rows.row_outcomes, rows.row_books, rows.row_odds
+
+        # Plain lists rather than the outcome dicts, so the joined snapshot can be freed
+        self.groups = groups
+        self.outcome_names = outcome_names
+        self.best_books = best_books
+        self.best_odds = best_odds = np.asarray(best_odds, dtype=np.float64)
+        self.bookmakers = list(bookmakers)
+        match_ids = {}
+        self.group_matches = np.fromiter(
+            (match_ids.setdefault(match, len(match_ids)) for match, _, _ in groups), dtype=np.intp, count=len(groups))
+        self.match_ids = match_ids
+        num_groups, num_books = len(groups), max(len(bookmakers), 1)
+        self.group_starts = np.zeros(num_groups + 1, dtype=np.intp)
+        self.best_overround = np.zeros(num_groups)
+        self.book_overround = np.full((num_groups, num_books), np.nan)
+        # Result orders, best first: group ids for surebets and overround, price rows for value
+        self.surebet_order = np.zeros(0, dtype=np.intp)
+        self.overround_order = np.zeros(0, dtype=np.intp)
+        self.value_order = np.zeros(0, dtype=np.intp)
+        self.row_groups = np.zeros(0, dtype=np.intp)
+        self.edges = np.zeros(0)
+        if not row_odds:
+            return
+
+        outcome_groups = np.asarray(outcome_groups, dtype=np.intp)
+        self.row_outcomes = row_outcomes = np.asarray(row_outcomes, dtype=np.intp)
+        self.row_books = row_books = np.asarray(row_books, dtype=np.intp)
+        self.row_odds = row_odds = np.asarray(row_odds, dtype=np.float64)
+        self.row_groups = row_groups = outcome_groups[row_outcomes]
+
+        # Per-bookmaker books: which bookmakers quote every outcome of a group, and at what overround
+        group_sizes = np.bincount(outcome_groups, minlength=num_groups)
+        # Outcomes are numbered group by group, so each group is a slice of the outcome lists
+        self.group_starts = np.concatenate(([0], np.cumsum(group_sizes)))
+        book_keys = row_groups * num_books + row_books
+        book_counts = np.bincount(book_keys, minlength=num_groups * num_books).reshape(num_groups, num_books)
+        book_sums = np.bincount(book_keys, weights=1.0 / row_odds, minlength=num_groups * num_books).reshape(num_groups, num_books)
+        full_books = (book_counts == group_sizes[:, None]) & (group_sizes[:, None] >= 2)
+        self.book_overround = np.where(full_books, book_sums, np.nan)
+        self.best_overround = np.bincount(outcome_groups, weights=1.0 / best_odds, minlength=num_groups)
+        # Groups some bookmaker prices as a full book; a single book below 1 means
+        # outcomes are missing or overlap (unpriced options, split score grids)
+        proper_groups = (full_books & (book_sums >= 1.0)).any(axis=1)
+        priced = np.flatnonzero(proper_groups)
+        self.overround_order = priced[np.argsort(self.best_overround[priced], kind='stable')]
+
+        # Surebets: the best prices across bookmakers of a proper group sum to less than 1
+        surebets = np.flatnonzero(proper_groups & (self.best_overround < 1.0))
+        self.surebet_order = surebets[np.argsort(self.best_overround[surebets], kind='stable')]
+
+        # Value: price times the consensus margin-free probability of its outcome
+        row_full = full_books[row_groups, row_books]
+        fair = np.where(row_full, (1.0 / row_odds) / np.where(row_full, book_sums[row_groups, row_books], 1.0), 0.0)
+        fair_sums = np.bincount(row_outcomes, weights=fair, minlength=len(outcome_names))
+        fair_counts = np.bincount(row_outcomes, weights=row_full, minlength=len(outcome_names))
+        self.consensus = np.divide(fair_sums, fair_counts, out=np.zeros(len(outcome_names)), where=fair_counts > 0)
+        self.edges = row_odds * self.consensus[row_outcomes] - 1.0
+        value = np.flatnonzero((fair_counts[row_outcomes] >= MIN_CONSENSUS_BOOKS) & (self.edges > MIN_VALUE_EDGE))
+        self.value_order = value[np.argsort(-self.edges[value], kind='stable')]
+
+    def surebet_entry(self, group_id):
+        match, market, group = self.groups[group_id]
+        overround = float(self.best_overround[group_id])
+        # Share of the total stake on each leg, so every outcome returns the same amount
+        legs = [
+            {'outcome': self.outcome_names[i], 'odds': float(self.best_odds[i]), 'bookmaker': self.best_books[i],
+             'stake_share': round(1.0 / float(self.best_odds[i]) / overround, 4)}
+            for i in range(self.group_starts[group_id], self.group_starts[group_id + 1])
+        ]
+        return {'match': match, 'market': market, 'group': group,
+                'overround': round(overround, 4), 'profit': round(1.0 / overround - 1.0, 4), 'legs': legs}
+
+    def value_entry(self, row):
+        match, market, group = self.groups[self.row_groups[row]]
+        outcome_id = self.row_outcomes[row]
+        return {'match': match, 'market': market, 'group': group,
+                'outcome': self.outcome_names[outcome_id],
+                'bookmaker': self.bookmakers[self.row_books[row]],
+                'odds': float(self.row_odds[row]),
+                'fair_odds': round(1.0 / float(self.consensus[outcome_id]), 3),
+                'edge': round(float(self.edges[row]), 4)}
+
+    def overround_entry(self, group_id):
+        match, market, group = self.groups[group_id]
+        books = {
+            bookmaker: round(float(value), 4)
+            for bookmaker, value in zip(self.bookmakers, self.book_overround[group_id]) if not np.isnan(value)
+        }
+        return {'match': match, 'market': market, 'group': group,
+                'best_overround': round(float(self.best_overround[group_id]), 4), 'bookmakers': books}
+
+    def query(self, kind, limit=50, match=None, min_edge=0.0):
+        """Scan results of one kind, best first, optionally for one match"""
+        if kind == 'surebets':
+            order, groups, entry = self.surebet_order, self.surebet_order, self.surebet_entry
+        elif kind == 'value':
+            order, entry = self.value_order, self.value_entry
+            # Sorted by edge, so the prices above min_edge are a prefix
+            order = order[:np.count_nonzero(self.edges[order] >= min_edge)]
+            groups = self.row_groups[order]
+        elif kind == 'overround':
+            order, groups, entry = self.overround_order, self.overround_order, self.overround_entry
+        else:
+            raise ValueError(f"Unknown scan kind '{kind}', expected one of {', '.join(SCAN_KINDS)}")
+        if match is not None:
+            match_id = self.match_ids.get(match, -1)
+            order = order[self.group_matches[groups] == match_id]
+        return [entry(item) for item in order[:max(limit, 0)]]
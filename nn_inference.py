@@ -0,0 +1,110 @@
+"""NumPy inference for the BetPredictor network, without importing torch.
+
+The network is input -> Linear(16) -> ReLU -> Linear(1) -> Sigmoid, so its
+weights are the four arrays of its state dict ('fc1.weight', 'fc1.bias',
+'fc2.weight', 'fc2.bias'). They are read from the exported nn_model.npz or
+straight from a torch nn_model.pth (a zip holding a pickled state dict and the
+raw tensor data), and evaluated with two matmuls. Torch is only imported by
+nn_training.py, in processes that train.
+"""
+import collections
+import os
+import pickle
+import zipfile
+
+import numpy as np
+
+HIDDEN_SIZE = 16
+WEIGHT_NAMES = ('fc1.weight', 'fc1.bias', 'fc2.weight', 'fc2.bias')
+
+# Element types of the torch storages a float model can hold
+STORAGE_DTYPES = {
+    'FloatStorage': np.dtype('<f4'),
+    'DoubleStorage': np.dtype('<f8'),
+    'HalfStorage': np.dtype('<f2'),
+    'LongStorage': np.dtype('<i8'),
+    'IntStorage': np.dtype('<i4'),
+}
+
+
+def init_weights(input_size, rng=None):
+    """Fresh weights, drawn like torch's nn.Linear defaults (uniform in +-1/sqrt(fan_in))"""
+    rng = rng or np.random.default_rng()
+    def uniform(fan_in, shape):
+        bound = 1.0 / np.sqrt(fan_in)
+        return rng.uniform(-bound, bound, shape).astype(np.float32)
+    return {
+        'fc1.weight': uniform(input_size, (HIDDEN_SIZE, input_size)),
+        'fc1.bias': uniform(input_size, HIDDEN_SIZE),
+        'fc2.weight': uniform(HIDDEN_SIZE, (1, HIDDEN_SIZE)),
+        'fc2.bias': uniform(HIDDEN_SIZE, 1),
+    }
+
+
+def predict(weights, features):
+    """Scores in (0, 1) for a (rows, input_size) float32 feature matrix"""
+    hidden = features @ weights['fc1.weight'].T
+    hidden += weights['fc1.bias']
+    np.maximum(hidden, 0.0, out=hidden)
+    logits = (hidden @ weights['fc2.weight'].T)[:, 0] + weights['fc2.bias'][0]
+    with np.errstate(over='ignore'):
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+def input_size_of(weights):
+    return weights['fc1.weight'].shape[1]
+
+
+class StateDictUnpickler(pickle.Unpickler):
+    """Unpickle a torch state dict into NumPy arrays, allowing nothing but tensors"""
+
+    def __init__(self, archive, prefix):
+        super().__init__(archive.open(f'{prefix}/data.pkl'))
+        self.archive = archive
+        self.prefix = prefix
+
+    def find_class(self, module, name):
+        if (module, name) == ('collections', 'OrderedDict'):
+            return collections.OrderedDict
+        if (module, name) == ('torch._utils', '_rebuild_tensor_v2'):
+            return rebuild_tensor
+        if module == 'torch' and name in STORAGE_DTYPES:
+            return STORAGE_DTYPES[name]
+        raise pickle.UnpicklingError(f"Unexpected object in a model file: {module}.{name}")
+
+    def persistent_load(self, saved_id):
+        # ('storage', storage type, key, device, number of elements)
+        _, dtype, key, _, _ = saved_id
+        return np.frombuffer(self.archive.read(f'{self.prefix}/data/{key}'), dtype=dtype)
+
+
+def rebuild_tensor(storage, offset, size, stride, *_):
+    itemsize = storage.dtype.itemsize
+    view = np.lib.stride_tricks.as_strided(
+        storage[offset:], shape=tuple(size), strides=tuple(step * itemsize for step in stride))
+    return np.array(view, dtype=np.float32)
+
+
+def read_pth(path):
+    """Weights from a torch.save'd state dict, read without torch"""
+    with zipfile.ZipFile(path) as archive:
+        prefix = archive.namelist()[0].split('/', 1)[0]
+        if archive.read(f'{prefix}/byteorder').strip() not in (b'', b'little'):
+            raise ValueError(f"{path} was saved on a big-endian machine")
+        state = StateDictUnpickler(archive, prefix).load()
+    return {name: state[name] for name in WEIGHT_NAMES}
+
+
+def read_weights(path):
+    """Weights from an exported .npz or a torch .pth file"""
+    if str(path).endswith('.npz'):
+        with np.load(path) as data:
+            return {name: data[name].astype(np.float32) for name in WEIGHT_NAMES}
+    return read_pth(path)
+
+
+def write_npz(weights, path):
+    """Export the weights atomically, so other processes never read a partial file"""
+    tmp_file = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **weights)
+    os.replace(tmp_file, path)
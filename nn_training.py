@@ -0,0 +1,57 @@
+"""Torch training for the BetPredictor network.
+
+Imported by bet_suggestor on the first training step only, so processes that
+just serve suggestions never load torch (they score with nn_inference.py).
+"""
+import os
+
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+# Define a simple neural network
+class BetPredictor(nn.Module):
+    def __init__(self, input_size):
+        super(BetPredictor, self).__init__()
+        self.fc1 = nn.Linear(input_size, 16)
+        self.relu = nn.ReLU()
+        self.fc2 = nn.Linear(16, 1)
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        x = self.fc1(x)
+        x = self.relu(x)
+        x = self.fc2(x)
+        x = self.sigmoid(x)
+        return x
+
+
+class Trainer:
+    """The network and its optimizer, whose Adam state carries over between training calls"""
+
+    def __init__(self, input_size):
+        self.model = BetPredictor(input_size)
+        self.optimizer = optim.Adam(self.model.parameters(), lr=0.01)
+        self.criterion = nn.BCELoss()
+
+    def train(self, weights, rows, label):
+        """Train from the given NumPy weights on feature rows sharing one label; returns the new weights"""
+        with torch.no_grad():
+            for name, param in self.model.named_parameters():
+                param.copy_(torch.from_numpy(weights[name]))
+        target = torch.tensor([label], dtype=torch.float32)
+        self.model.train()
+        for row in rows:
+            self.optimizer.zero_grad()
+            output = self.model(torch.from_numpy(row))
+            loss = self.criterion(output, target)
+            loss.backward()
+            self.optimizer.step()
+        self.model.eval()
+        return {name: param.detach().numpy().copy() for name, param in self.model.named_parameters()}
+
+    def save(self, path):
+        """Write the weights as a torch state dict (atomically)"""
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        torch.save(self.model.state_dict(), tmp_file)
+        os.replace(tmp_file, path)
@@ -0,0 +1,111 @@
+"""Join the odds files of several bookmakers into one best-price snapshot.
+
+Every scraper writes the same schema (match_title/markets/groups/outcomes) to
+its own file. Teams, markets and outcomes are resolved to canonical names (see
+canonical_names.py) and all sources are merged in one pass over their outcomes
+with dicts keyed by those names, so the join stays linear in the number of
+outcomes however many sources there are.
+
+The merged snapshot keeps the scraper schema, naming each match, market and
+outcome as the first source (in priority order) that had it. Each outcome
+carries the best odds, the bookmaker offering them and every bookmaker's price.
+A single source needs no join; iter_source passes it through match by match,
+so its tree never has to exist as a whole.
+"""
+from canonical_names import get_canonicalizer, normalize_name
+
+def parse_odds(value):
+    try:
+        odds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return odds if odds > 1.0 else None
+
+def occurrence(counts, key):
+    """(key, how many times key was seen before in counts)"""
+    seen = counts.get(key, 0)
+    counts[key] = seen + 1
+    return key, seen
+
+def new_match(match):
+    return {'entry': {'match_title': match['match_title'], 'markets': []}, 'markets': {}}
+
+def merge_match(names, bookmaker, teams, match, merged_match):
+    """Merge one source match into its merged entry, keeping the best price per outcome.
+
+    A market or outcome whose name repeats within the source match or group (a
+    level handicap's home and away '0') is keyed by its occurrence, so it meets
+    the same occurrence in other sources and never overwrites its namesake.
+    """
+    market_counts = {}
+    for market in match['markets']:
+        market_key = occurrence(market_counts, names.markets.resolve(market['market_name'], bookmaker))
+        merged_market = merged_match['markets'].get(market_key)
+        if merged_market is None:
+            merged_market = merged_match['markets'][market_key] = {
+                'entry': {'market_name': market['market_name'], 'groups': []}, 'groups': {}}
+            merged_match['entry']['markets'].append(merged_market['entry'])
+        for position, group in enumerate(market['groups']):
+            # Untitled groups (each line of an Asian handicap, say) are told apart by
+            # their position in the market, so outcomes of different lines never merge
+            title = group['group_title']
+            group_key = normalize_name(title) if title else (None, position)
+            merged_group = merged_market['groups'].get(group_key)
+            if merged_group is None:
+                merged_group = merged_market['groups'][group_key] = {
+                    'entry': {'group_title': group['group_title'], 'outcomes': []}, 'outcomes': {}}
+                merged_market['entry']['groups'].append(merged_group['entry'])
+            outcome_counts = {}
+            for outcome in group['outcomes']:
+                odds = parse_odds(outcome['odds'])
+                if odds is None:
+                    continue
+                outcome_key = occurrence(outcome_counts, names.outcome(outcome['outcome'], teams, bookmaker))
+                merged_outcome = merged_group['outcomes'].get(outcome_key)
+                if merged_outcome is None:
+                    merged_outcome = merged_group['outcomes'][outcome_key] = {
+                        'outcome': outcome['outcome'], 'odds': odds, 'bookmaker': bookmaker, 'prices': {}}
+                    merged_group['entry']['outcomes'].append(merged_outcome)
+                elif odds > merged_outcome['odds']:
+                    merged_outcome['odds'] = odds
+                    merged_outcome['bookmaker'] = bookmaker
+                merged_outcome['prices'][bookmaker] = max(odds, merged_outcome['prices'].get(bookmaker, 0.0))
+
+def save_names(names):
+    try:
+        # Keep the spellings learned in this join for the next one
+        names.save()
+    except OSError as e:
+        print(f"Could not save the name cache: {e}")
+
+def aggregate(sources):
+    """Merge [(bookmaker, odds_data), ...] into one snapshot with the best price per outcome"""
+    names = get_canonicalizer()
+    matches = {}
+    merged = []
+    for bookmaker, odds_data in sources:
+        for match in odds_data:
+            teams = names.match(match['match_title'], bookmaker)
+            merged_match = matches.get(teams)
+            if merged_match is None:
+                merged_match = matches[teams] = new_match(match)
+                merged.append(merged_match['entry'])
+            merge_match(names, bookmaker, teams, match, merged_match)
+    save_names(names)
+    return merged
+
+def iter_source(bookmaker, odds_data):
+    """Yield one source's matches in the merged schema, each as soon as it is read.
+
+    A single source needs no best-price join: matches, markets, groups and
+    outcomes are kept as parsed, only the odds are normalized (outcomes without
+    valid odds are dropped) and each outcome is tagged with the bookmaker.
+    """
+    for match in odds_data:
+        yield {'match_title': match['match_title'], 'markets': [
+            {'market_name': market['market_name'], 'groups': [
+                {'group_title': group['group_title'], 'outcomes': [
+                    {'outcome': outcome['outcome'], 'odds': odds, 'bookmaker': bookmaker, 'prices': {bookmaker: odds}}
+                    for outcome in group['outcomes'] for odds in [parse_odds(outcome['odds'])] if odds is not None]}
+                for group in market['groups']]}
+            for market in match['markets']]}
@@ -0,0 +1,216 @@
+"""Append-only odds history, fed by the scrapers and queried by the API.
+
+Every scraper run overwrites its odds file, so each run is also recorded here
+as price points in a local SQLite database (odds/history.db, or
+TSIPSTER_HISTORY_DB). Selections (bookmaker/match/market/group/outcome) are
+stored once; a price point is only appended when a selection's odds differ
+from its last recorded price. Prices are clustered by (selection, time), so a
+price series is one index range scan, and indexed by time, so the biggest
+movers since T only visit selections that moved after T.
+
+Usage:
+    history = OddsHistory()
+    history.record_snapshot(odds_data, 'winmasters')
+    history.price_series('Λιόν vs Ρόμα', 'Τελικό Αποτέλεσμα', 'Ρόμα')
+    history.movers(since=time.time() - 3600)
+"""
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+
+DEFAULT_PATH = 'odds/history.db'
+
+# Window for the movers endpoint when no 'since' is given
+DEFAULT_MOVERS_WINDOW = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS selections (
+    id INTEGER PRIMARY KEY,
+    match TEXT NOT NULL,
+    market TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    bookmaker TEXT NOT NULL,
+    last_ts INTEGER,
+    last_odds REAL,
+    UNIQUE (match, market, outcome, grp, bookmaker)
+);
+CREATE TABLE IF NOT EXISTS prices (
+    selection_id INTEGER NOT NULL REFERENCES selections (id),
+    ts INTEGER NOT NULL,
+    odds REAL NOT NULL,
+    PRIMARY KEY (selection_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_ts ON prices (ts);
+-- record() loads one bookmaker's selections at a time
+CREATE INDEX IF NOT EXISTS selections_bookmaker ON selections (bookmaker);
+"""
+
+SERIES_QUERY = """
+SELECT s.bookmaker, s.grp, p.ts, p.odds
+FROM selections s JOIN prices p ON p.selection_id = s.id
+WHERE s.match = ? AND s.market = ? AND s.outcome = ? AND p.ts >= ?
+"""
+
+MOVERS_QUERY = """
+WITH moved AS (SELECT DISTINCT selection_id FROM prices WHERE ts > :since),
+start AS (
+    SELECT s.*, COALESCE(
+        (SELECT odds FROM prices WHERE selection_id = s.id AND ts <= :since ORDER BY ts DESC LIMIT 1),
+        (SELECT odds FROM prices WHERE selection_id = s.id ORDER BY ts LIMIT 1)) AS start_odds
+    FROM moved JOIN selections s ON s.id = moved.selection_id
+    WHERE (:match IS NULL OR s.match = :match) AND (:bookmaker IS NULL OR s.bookmaker = :bookmaker)
+)
+SELECT bookmaker, match, market, grp, outcome, start_odds, last_odds, last_ts
+FROM start
+WHERE start_odds != last_odds
+ORDER BY max(last_odds / start_odds, start_odds / last_odds) DESC
+LIMIT :limit
+"""
+
+def default_path():
+    return os.environ.get('TSIPSTER_HISTORY_DB', DEFAULT_PATH)
+
+def parse_time(value):
+    """Unix seconds from a number or an ISO 8601 string"""
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp())
+
+def iter_prices(odds_data):
+    """(match, market, group, outcome, odds) for every priced outcome in the scraper schema"""
+    for match in odds_data:
+        for market in match['markets']:
+            for group in market['groups']:
+                for outcome in group['outcomes']:
+                    try:
+                        odds = float(outcome['odds'])
+                    except (TypeError, ValueError):
+                        continue
+                    yield match['match_title'], market['market_name'], group['group_title'] or '', outcome['outcome'], odds
+
+
+class OddsHistory:
+    """SQLite-backed store of every price the scrapers have seen"""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def record_snapshot(self, odds_data, bookmaker, ts=None):
+        """Append the prices of one scraper run; returns the number of price points written"""
+        ts = int(time.time() if ts is None else ts)
+        with closing(self.connect()) as conn, conn:
+            known = {
+                (match, market, grp, outcome): (selection_id, last_odds)
+                for selection_id, match, market, grp, outcome, last_odds in conn.execute(
+                    'SELECT id, match, market, grp, outcome, last_odds FROM selections WHERE bookmaker = ?',
+                    (bookmaker,))
+            }
+            points = []
+            for match, market, grp, outcome, odds in iter_prices(odds_data):
+                selection = known.get((match, market, grp, outcome))
+                if selection is None:
+                    cursor = conn.execute(
+                        'INSERT INTO selections (match, market, outcome, grp, bookmaker) VALUES (?, ?, ?, ?, ?)',
+                        (match, market, outcome, grp, bookmaker))
+                    selection = (cursor.lastrowid, None)
+                    known[(match, market, grp, outcome)] = selection
+                selection_id, last_odds = selection
+                if odds != last_odds:
+                    points.append((selection_id, ts, odds))
+                    known[(match, market, grp, outcome)] = (selection_id, odds)
+            conn.executemany('INSERT OR REPLACE INTO prices (selection_id, ts, odds) VALUES (?, ?, ?)', points)
+            conn.executemany('UPDATE selections SET last_ts = ?, last_odds = ? WHERE id = ?',
+                             [(point_ts, odds, selection_id) for selection_id, point_ts, odds in points])
+        return len(points)
+
+    def price_series(self, match, market, outcome, group=None, bookmaker=None, since=None):
+        """Price points of one outcome, oldest first, across bookmakers unless one is given"""
+        query = SERIES_QUERY
+        params = [match, market, outcome, since or 0]
+        if group is not None:
+            query += ' AND s.grp = ?'
+            params.append(group)
+        if bookmaker is not None:
+            query += ' AND s.bookmaker = ?'
+            params.append(bookmaker)
+        query += ' ORDER BY s.bookmaker, s.grp, p.ts'
+        with closing(self.connect()) as conn:
+            return [
+                {'bookmaker': row[0], 'group': row[1] or None, 'ts': row[2], 'odds': row[3]}
+                for row in conn.execute(query, params)
+            ]
+
+    def movers(self, since, limit=20, match=None, bookmaker=None):
+        """Selections whose price moved most (by ratio) between `since` and their latest price"""
+        params = {'since': int(since), 'limit': int(limit), 'match': match, 'bookmaker': bookmaker}
+        with closing(self.connect()) as conn:
+            rows = conn.execute(MOVERS_QUERY, params).fetchall()
+        return [
+            {
+                'bookmaker': bookmaker, 'match': match, 'market': market, 'group': grp or None,
+                'outcome': outcome, 'start_odds': start_odds, 'odds': odds, 'last_ts': last_ts,
+                'change': round(odds / start_odds - 1.0, 4),
+            }
+            for bookmaker, match, market, grp, outcome, start_odds, odds, last_ts in rows
+        ]
+
+def record_scrape(odds_data, bookmaker):
+    """Record a scraper run, reporting rather than raising database errors so the scrape still completes"""
+    try:
+        written = OddsHistory().record_snapshot(odds_data, bookmaker)
+        print(f"Recorded {written} changed prices in the odds history")
+    except sqlite3.Error as e:
+        print(f"Could not record odds history: {e}")
+
+# Shared by the API endpoints, opened on first use
+history = None
+
+def get_history():
+    global history
+    if history is None:
+        history = OddsHistory()
+    return history
+
+def series_endpoint(args):
+    """Handle GET /api/odds-history; args are the query parameters"""
+    try:
+        match, market, outcome = args.get('match'), args.get('market'), args.get('outcome')
+        if not (match and market and outcome):
+            return {'error': 'match, market and outcome are required'}, 400
+        since = args.get('since')
+        series = get_history().price_series(
+            match, market, outcome, group=args.get('group'), bookmaker=args.get('bookmaker'),
+            since=parse_time(since) if since else None)
+        return {'match': match, 'market': market, 'outcome': outcome, 'series': series}, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
+
+def movers_endpoint(args):
+    """Handle GET /api/odds-movers; args are the query parameters"""
+    try:
+        since = args.get('since')
+        since = parse_time(since) if since else int(time.time()) - DEFAULT_MOVERS_WINDOW
+        movers = get_history().movers(
+            since, limit=int(args.get('limit', 20)), match=args.get('match'), bookmaker=args.get('bookmaker'))
+        return {'since': since, 'movers': movers}, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
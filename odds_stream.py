@@ -0,0 +1,140 @@
+"""Read and write odds files one match at a time.
+
+Odds files are either a JSON array of match objects (what the scrapers write)
+or NDJSON, one match object per line (.ndjson / .jsonl). iter_matches yields
+the matches of either incrementally: the JSON array is decoded match by match
+from a sliding buffer, so only the match being merged and a chunk of raw text
+are held at a time, never the whole file's parsed tree.
+
+MatchSink is the writing side for scrapers: every match is appended to a
+partial NDJSON file as soon as it is parsed (so it survives a crash and can be
+tailed while the scrape runs), and finish() publishes the JSON array with an
+atomic rename, so readers never see a half-written odds file. write_matches
+does the same atomic publish for a list of matches held in memory.
+"""
+import json
+import os
+import re
+import textwrap
+import threading
+
+CHUNK_SIZE = 1 << 20
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+# Whitespace and separators between the elements of the top-level array
+SEPARATOR = re.compile(r'[\s,]*')
+
+
+def iter_matches(path, chunk_size=CHUNK_SIZE):
+    """Match objects of an odds file, decoded one at a time; opening errors raise here, not on iteration"""
+    f = open(path, 'r', encoding='utf-8')
+    if str(path).endswith(NDJSON_SUFFIXES):
+        return iter_ndjson(f)
+    return iter_json_array(f, chunk_size)
+
+
+def iter_ndjson(f):
+    with f:
+        for line in f:
+            # A scraper still writing may leave a partial last line; it is skipped
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    if line.endswith('\n'):
+                        raise
+
+
+def iter_json_array(f, chunk_size):
+    decoder = json.JSONDecoder()
+    with f:
+        buffer = f.read(chunk_size).lstrip('﻿ \t\r\n')
+        if not buffer.startswith('['):
+            raise ValueError(f"{f.name} is not a JSON array of matches")
+        pos = 1
+        eof = False
+        while True:
+            pos = SEPARATOR.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                # Matches are objects, so a match cut off at the end of the buffer never decodes
+                match, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield match
+            pos = end
+
+
+def partial_path(path):
+    """The NDJSON file a scrape streams to before publishing `path`"""
+    return f"{os.path.splitext(path)[0]}.partial.ndjson"
+
+
+class MatchSink:
+    """Stream match objects to a partial NDJSON file, then publish them as a JSON array.
+
+    write() is safe to call from several parser threads. The partial file is
+    flushed after every match; it is left in place if the scrape dies, and
+    `publish(path)` turns it into the odds file later.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.partial = partial_path(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.partial, 'w', encoding='utf-8')
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, match):
+        line = json.dumps(match, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.count += 1
+
+    def finish(self):
+        """Publish every match written so far as the odds file; returns the number of matches"""
+        with self.lock:
+            self.file.close()
+        return publish(self.path)
+
+
+def publish(path):
+    """Replace `path` atomically with the matches of its partial NDJSON file and remove that file"""
+    partial = partial_path(path)
+    count = write_matches(path, iter_matches(partial))
+    os.remove(partial)
+    return count
+
+
+def write_matches(path, matches):
+    """Replace `path` atomically with a JSON array of matches; returns the number written.
+
+    The output is laid out as json.dump(matches, indent=4) would, one match at a time.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for match in matches:
+            f.write(',\n' if count else '\n')
+            f.write(textwrap.indent(json.dumps(match, ensure_ascii=False, indent=4), '    '))
+            count += 1
+        f.write('\n]' if count else ']')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    return count
@@ -0,0 +1,243 @@
+"""Scrape the winmasters match pages with any number of worker processes and machines.
+
+The coordinator enqueues the match URLs as one batch of a scrape queue (see
+scrape_queue.py), optionally starts local workers and serves the queue to
+remote ones, waits until every job is done or dead-lettered, and then
+publishes the parsed matches as the odds file and records them in the odds
+history, like winmasters_scraper.py does for a single process.
+
+A worker claims one job at a time, fetches the page (browser, HTTP or auto,
+as in winmasters_scraper.py --fetch), parses it and reports the match back,
+renewing its lease with heartbeats while it works. Each worker runs its own
+browser, so capacity grows with the number of workers; add machines by
+starting workers there against the coordinator's --serve address.
+
+Usage:
+    TSIPSTER_QUEUE_TOKEN=<secret> python scrapers/distributed_scrape.py coordinator --local-workers 4 --serve 0.0.0.0:8766
+    TSIPSTER_QUEUE_TOKEN=<secret> python scrapers/distributed_scrape.py worker --queue http://coordinator-host:8766
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+# odds_history and odds_stream live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from odds_history import record_scrape
+from odds_stream import iter_matches, write_matches
+
+from http_fetcher import HttpFetcher, HttpFetchError
+from page_fetcher import FetchError, PageFetcher
+from scrape_queue import QueueServer, ScrapeQueue, open_queue
+from winamsters_eul_match_getter import MATCH_URLS_FILE
+from winmasters_scraper import (DEAD_LETTER_FILE, ODDS_FILE, fetch_page_source, make_driver, page_from_html,
+                                parse_source)
+
+
+# Consecutive failed calls to a remote queue before a worker gives up
+QUEUE_RETRIES = 30
+
+
+def queue_call(method, *args, retry_interval=2.0):
+    """Call a queue method, retrying a RemoteQueue's transient HTTP errors every retry_interval seconds"""
+    for attempt in range(QUEUE_RETRIES):
+        try:
+            return method(*args)
+        except requests.RequestException as e:
+            if attempt == QUEUE_RETRIES - 1:
+                raise
+            print(f"Queue {method.__name__} failed: {e}; retrying in {retry_interval:g}s")
+            time.sleep(retry_interval)
+
+
+def batch_finished(progress):
+    return not progress.get('pending') and not progress.get('leased')
+
+
+class Heartbeat:
+    """Renew a job's lease every `interval` seconds while the block runs"""
+
+    def __init__(self, queue, job, worker, interval):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True, name='heartbeat')
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job['id'], self.worker):
+                    print(f"Lost the lease on {self.job['url'][:100]}; another worker has it")
+                    return
+            except Exception as e:
+                print(f"Heartbeat failed: {e}")
+
+
+def fetch_match_page(url, page_fetcher, http_fetcher, fallback):
+    """(match_title, html) of a match page; raises with the reason when it cannot be fetched"""
+    if http_fetcher is not None:
+        error = "markets are not in the HTML"
+        try:
+            page = page_from_html(http_fetcher.fetch(url))
+        except HttpFetchError as e:
+            page, error = None, e
+        if page is not None:
+            return page
+        if not fallback:
+            raise FetchError(error)
+    page = page_fetcher.fetch(url)
+    if page is None:
+        raise FetchError(page_fetcher.dead_letters.pop()['error'])
+    return page
+
+
+def work(queue, worker, batch=None, fetch_mode='browser', http_connections=4, deadline=45.0,
+         heartbeat_interval=30.0, poll_interval=2.0, replay=None):
+    """Process jobs until the batch is finished (forever without a batch); returns the number done"""
+    # Retries happen through the queue, where another worker may get the job
+    page_fetcher = PageFetcher(make_driver, fetch_page_source, deadline=deadline, max_attempts=1)
+    http_fetcher = HttpFetcher(http_connections, replay_base=replay) if fetch_mode != 'browser' else None
+    done = 0
+    try:
+        while True:
+            job = queue_call(queue.claim, worker, batch, retry_interval=poll_interval)
+            if job is None:
+                if batch is not None and batch_finished(queue_call(queue.progress, batch, retry_interval=poll_interval)):
+                    break
+                time.sleep(poll_interval)
+                continue
+            with Heartbeat(queue, job, worker, heartbeat_interval):
+                try:
+                    match = parse_source(*fetch_match_page(job['url'], page_fetcher, http_fetcher,
+                                                           fetch_mode == 'auto'))
+                    error = None if match else "no markets parsed"
+                except Exception as e:
+                    match, error = None, e
+            if match is not None:
+                if queue_call(queue.complete, job['id'], worker, match, retry_interval=poll_interval):
+                    done += 1
+            else:
+                print(f"Attempt {job['attempts']} at {job['url'][:100]} failed: {error}")
+                queue_call(queue.fail, job['id'], worker, error, retry_interval=poll_interval)
+    finally:
+        page_fetcher.close()
+        if http_fetcher is not None:
+            http_fetcher.close()
+    return done
+
+
+def coordinate(queue, batch, urls, local_workers=0, worker_args=(), poll_interval=2.0, serving=False):
+    """Enqueue the URLs, wait for the batch, then publish its matches and dead letters.
+
+    Without a queue server, nothing else can finish the batch once every local
+    worker has exited; the coordinator then stops waiting and returns None
+    without publishing, leaving the unfinished jobs in the queue so that a run
+    with the same --batch resumes them.
+    """
+    added = queue.enqueue(batch, urls)
+    print(f"Enqueued {added} match URLs as batch {batch}")
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', '--queue', queue.path,
+                          '--batch', batch, '--lease', str(queue.lease), '--attempts', str(queue.max_attempts),
+                          *worker_args])
+        for _ in range(local_workers)
+    ]
+    last = None
+    while True:
+        progress = queue.progress(batch)
+        if progress != last:
+            print("Progress: " + ", ".join(f"{count} {state}" for state, count in sorted(progress.items())))
+            last = progress
+        if batch_finished(progress):
+            break
+        if workers and not serving and all(process.poll() is not None for process in workers):
+            unfinished = progress.get('pending', 0) + progress.get('leased', 0)
+            print(f"Every local worker exited with {unfinished} jobs unfinished; not publishing. "
+                  f"Run again with --batch {batch} to resume them.")
+            return None
+        time.sleep(poll_interval)
+    for process in workers:
+        process.wait()
+
+    count = write_matches(ODDS_FILE, queue.results(batch))
+    print(f"Processed {count} matches. Odds data saved to {ODDS_FILE}")
+    record_scrape(iter_matches(ODDS_FILE), 'winmasters')
+    failures = queue.failures(batch)
+    with open(DEAD_LETTER_FILE, 'w', encoding='utf-8') as f:
+        json.dump(failures, f, ensure_ascii=False, indent=4)
+    if failures:
+        print(f"{len(failures)} URLs failed every attempt; see {DEAD_LETTER_FILE}")
+    return count
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Scrape winmasters with a queue of worker processes")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    coordinator_parser = commands.add_parser("coordinator", help="enqueue the match URLs and publish the results")
+    coordinator_parser.add_argument("--queue", help="queue database (default: odds/scrape_queue.db or TSIPSTER_SCRAPE_QUEUE)")
+    coordinator_parser.add_argument("--batch", help="batch name (default: winmasters-<timestamp>)")
+    coordinator_parser.add_argument("--local-workers", type=int, default=0, help="worker processes to start on this machine")
+    coordinator_parser.add_argument("--serve", metavar="HOST:PORT", help="serve the queue to workers on other machines (needs TSIPSTER_QUEUE_TOKEN unless on loopback)")
+    coordinator_parser.add_argument("--lease", type=float, default=120.0, help="seconds a claimed job stays a worker's without a heartbeat")
+    coordinator_parser.add_argument("--attempts", type=int, default=3, help="attempts per URL before it is dead-lettered")
+    coordinator_parser.add_argument("--fetch", choices=["browser", "http", "auto"], default="browser", help="fetch mode of local workers")
+    coordinator_parser.add_argument("--replay", metavar="URL", help="local workers fetch over HTTP from this replay server")
+
+    worker_parser = commands.add_parser("worker", help="claim, fetch and parse jobs")
+    worker_parser.add_argument("--queue", help="queue database path, or the coordinator's http://HOST:PORT")
+    worker_parser.add_argument("--batch", help="only work on this batch, and exit when it is finished")
+    worker_parser.add_argument("--fetch", choices=["browser", "http", "auto"], default="browser")
+    worker_parser.add_argument("--deadline", type=float, default=45.0, help="seconds allowed per page")
+    worker_parser.add_argument("--heartbeat", type=float, default=30.0, help="seconds between lease renewals")
+    worker_parser.add_argument("--lease", type=float, default=120.0, help="lease length, when opening the queue database directly")
+    worker_parser.add_argument("--attempts", type=int, default=3, help="attempts per URL, when opening the queue database directly")
+    worker_parser.add_argument("--replay", metavar="URL", help="send HTTP fetches to a replay server (see replay_server.py)")
+
+    args = arg_parser.parse_args()
+    # Shared secret between the queue server and remote workers
+    token = os.environ.get('TSIPSTER_QUEUE_TOKEN')
+    if args.command == "coordinator":
+        queue = ScrapeQueue(args.queue, lease=args.lease, max_attempts=args.attempts)
+        if args.serve:
+            host, _, port = args.serve.rpartition(':')
+            try:
+                server = QueueServer(queue, host or '0.0.0.0', int(port), token)
+            except ValueError as e:
+                arg_parser.error(str(e))
+            server.start()
+            print(f"Serving the scrape queue on {args.serve}")
+        with open(MATCH_URLS_FILE, 'r', encoding='utf-8') as f:
+            match_urls = json.load(f)
+        worker_args = ['--fetch', args.fetch] + (['--replay', args.replay] if args.replay else [])
+        count = coordinate(queue, args.batch or time.strftime('winmasters-%Y%m%d-%H%M%S'), match_urls,
+                           args.local_workers, worker_args, serving=bool(args.serve))
+        if count is None:
+            sys.exit(1)
+    else:
+        name = worker_id()
+        queue = open_queue(args.queue, token, args.lease, args.attempts)
+        done = work(queue, name, args.batch, args.fetch, deadline=args.deadline,
+                    heartbeat_interval=args.heartbeat, replay=args.replay)
+        print(f"Worker {name} finished {done} jobs")
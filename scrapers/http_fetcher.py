@@ -0,0 +1,124 @@
+"""Browserless page fetching over pooled, conditional HTTP.
+
+Pages whose odds are in the served HTML do not need a Chrome session: an
+HttpFetcher fetches them with one requests.Session whose connection pool keeps
+connections alive across requests and threads, fetches many URLs concurrently
+(fetch_many), and revalidates pages it has seen with If-None-Match /
+If-Modified-Since, so an unchanged page costs a 304 instead of a full download.
+
+Scrapers decide per page whether the HTML is complete and fall back to the
+browser when it is not (see winmasters_scraper.py --fetch auto).
+
+`replay_base` sends every request to a replay server instead of the live site
+(see replay_server.py), and `record_dir` saves every response in the replay
+server's format, so a live run can be replayed offline.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import replay_server
+
+# Browsers send these; some sites serve bare clients a different page
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/124.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'el-GR,el;q=0.9,en;q=0.8',
+}
+
+
+class HttpFetchError(Exception):
+    """A page could not be fetched over HTTP (network error or an error status)"""
+
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client that revalidates the pages it has already fetched"""
+
+    def __init__(self, max_connections=8, timeout=15.0, max_cached=512, replay_base=None, record_dir=None,
+                 headers=None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_cached = max_cached
+        self.replay_base = replay_base.rstrip('/') if replay_base else None
+        self.recorder = replay_server.Recorder(record_dir) if record_dir else None
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        # One pool per host, each holding up to max_connections kept-alive connections
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # url -> (etag, last_modified, text) of the last full response, least recently used first
+        self.validators = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'not_modified': 0, 'bytes': 0, 'errors': 0}
+        self.pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='http-fetch')
+
+    def request_url(self, url):
+        if self.replay_base is None:
+            return url
+        parts = urlsplit(url)
+        return self.replay_base + (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+    def fetch(self, url):
+        """The page's text; a 304 answer returns the text cached from the last full response"""
+        headers = {}
+        with self.lock:
+            cached = self.validators.get(url)
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        try:
+            response = self.session.get(self.request_url(url), headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.count('errors')
+            raise HttpFetchError(f"{url}: {e}") from e
+        self.count('requests', size=len(response.content))
+        if response.status_code == 304 and cached is not None:
+            self.count('not_modified')
+            with self.lock:
+                if url in self.validators:
+                    self.validators.move_to_end(url)
+            return cached[2]
+        if response.status_code != 200:
+            self.count('errors')
+            raise HttpFetchError(f"{url}: HTTP {response.status_code}")
+        # Without a declared charset requests assumes ISO-8859-1; the sites serve UTF-8
+        if 'charset' not in response.headers.get('Content-Type', ''):
+            response.encoding = 'utf-8'
+        text = response.text
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self.lock:
+                self.validators[url] = (etag, last_modified, text)
+                self.validators.move_to_end(url)
+                while len(self.validators) > self.max_cached:
+                    self.validators.popitem(last=False)
+        if self.recorder is not None:
+            self.recorder.record(url, response.content, response.headers)
+        return text
+
+    def fetch_many(self, urls):
+        """Yield (url, text, error) for every URL, fetched max_connections at a time, in input order"""
+        def fetch_one(url):
+            try:
+                return url, self.fetch(url), None
+            except HttpFetchError as e:
+                return url, None, e
+        yield from self.pool.map(fetch_one, urls)
+
+    def count(self, name, size=0):
+        with self.lock:
+            self.stats[name] += 1
+            self.stats['bytes'] += size
+
+    def close(self):
+        self.pool.shutdown()
+        self.session.close()
@@ -0,0 +1,54 @@
+"""Group a market's outcomes into lines, shared by the novibet and stoiximan scrapers.
+
+Over/Under outcomes are grouped by their line ("Over 2.5" and "Under 2.5" under
+"2.5"), handicap outcomes ("-1.5", "+1") each under their own name, and
+3-way handicap outcomes under the market's "a:b" handicap, which is read once
+per market from its text. Outcomes are grouped in one pass with precompiled
+patterns and returned in the standard `groups` structure, in the order their
+lines first appear.
+"""
+import re
+
+# Markets whose outcomes are split into one group per line
+GROUPED_MARKETS = frozenset([
+    "Γκολ Over/Under", "Γκολ Over/Under, 1ο Ημίχρονο", "Ασιατικό Χάντικαπ",
+    "Ασιατικό Χάντικαπ, 1ο Ημίχρονο", "Κόρνερ Over/Under", "Κάρτες Over/Under",
+    "Χάντικαπ"
+])
+
+# A line, optionally signed or prefixed with Over/Under: "Over 2.5", "-1.5", "2"
+LINE_PATTERN = re.compile(r"(Over|Under|\+|-)?\s*([\d.]+)")
+# The handicap of a 3-way handicap market, e.g. "0:1"
+HANDICAP_PATTERN = re.compile(r"(\d+:\d+)")
+OVER_UNDER = ("Over", "Under")
+
+
+def group_outcomes(market_name, outcomes, market_text, verbose=False):
+    """The market's groups: one per line for GROUPED_MARKETS, otherwise a single untitled group.
+
+    market_text is a callable returning the market's full text; it is only
+    called (once) if an outcome needs the market's handicap.
+    """
+    if market_name not in GROUPED_MARKETS:
+        return [{"group_title": None, "outcomes": outcomes}]
+    groups = {}
+    handicap_line = None
+    for outcome in outcomes:
+        name = outcome["outcome"]
+        match = LINE_PATTERN.search(name)
+        if match:
+            line = match.group(2) if match.group(1) in OVER_UNDER else name
+        elif "Ισοπαλία" in name or market_name == "Χάντικαπ":
+            if handicap_line is None:
+                handicap_match = HANDICAP_PATTERN.search(market_text())
+                handicap_line = handicap_match.group(1) if handicap_match else "unknown"
+            line = handicap_line
+        else:
+            if verbose:
+                print(f"  Outcome '{name}' in '{market_name}' doesn't match grouping patterns")
+            line = "default"
+        group = groups.get(line)
+        if group is None:
+            group = groups[line] = []
+        group.append(outcome)
+    return [{"group_title": line, "outcomes": group} for line, group in groups.items()]
@@ -0,0 +1,157 @@
+"""Resilient page fetching for long Selenium scrapes.
+
+A PageFetcher wraps a driver factory and a page fetch function and gives
+each URL:
+- a deadline: every wait of the fetch function is capped by the time left
+  for the URL, so a slow page costs at most `deadline` seconds per attempt;
+- bounded retries with exponential backoff and jitter, on a fresh driver
+  (a failed page often leaves the browser stuck in a frame or a hung tab);
+- a dead-letter entry (URL, error, attempts) once its retries run out.
+
+Drivers are also recycled after `pages_per_driver` pages or when the browser's
+process tree grows past `max_driver_rss_mb`, so Chrome's memory growth does not
+slow down a long URL list.
+"""
+import os
+import random
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class FetchError(Exception):
+    """A page did not load what the scraper needs before its deadline"""
+
+
+def remaining(deadline):
+    """Seconds left before a time.monotonic() deadline; raises FetchError once it has passed"""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise FetchError("deadline exceeded")
+    return left
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants, or None if it cannot be measured"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 2**20
+        except psutil.Error:
+            return None
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    rss_pages = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                # The command name may contain spaces; fields after it are fixed
+                fields = f.read().rsplit(b')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss_pages[int(entry)] = int(fields[21])
+    if pid not in rss_pages:
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, ()))
+    return total * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+class PageFetcher:
+    """Fetch pages with per-URL deadlines, retries, driver recycling and a dead-letter list.
+
+    make_driver() returns a new Selenium driver. fetch_page(driver, url, deadline)
+    returns the page's result or raises; deadline is a time.monotonic() value.
+    """
+
+    def __init__(self, make_driver, fetch_page, deadline=45.0, max_attempts=3, backoff=2.0,
+                 pages_per_driver=40, max_driver_rss_mb=1500):
+        self.make_driver = make_driver
+        self.fetch_page = fetch_page
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.pages_per_driver = pages_per_driver
+        self.max_driver_rss_mb = max_driver_rss_mb
+        self.driver = None
+        self.driver_pages = 0
+        self.dead_letters = []
+        self.stats = {'pages': 0, 'retries': 0, 'recycles': 0, 'failed': 0}
+
+    def fetch(self, url):
+        """The result of fetch_page for url, or None once every attempt failed (the URL is dead-lettered)"""
+        error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.stats['retries'] += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            deadline = time.monotonic() + self.deadline
+            try:
+                driver = self.get_driver()
+                # driver.get blocks on the page load, so it gets the deadline too
+                driver.set_page_load_timeout(self.deadline)
+                result = self.fetch_page(driver, url, deadline)
+            except Exception as e:
+                error = e
+                print(f"Attempt {attempt + 1}/{self.max_attempts} for {url[:100]} failed: {e}")
+                self.recycle()
+                continue
+            self.stats['pages'] += 1
+            self.page_done()
+            return result
+        self.dead_letter(url, error, self.max_attempts)
+        return None
+
+    def dead_letter(self, url, error, attempts):
+        self.stats['failed'] += 1
+        self.dead_letters.append({'url': url, 'error': str(error).strip()[:500],
+                                  'attempts': attempts, 'time': int(time.time())})
+
+    def get_driver(self):
+        if self.driver is None:
+            self.driver = self.make_driver()
+            self.driver_pages = 0
+        return self.driver
+
+    def page_done(self):
+        """Recycle the driver once it has served its pages or grown too large"""
+        self.driver_pages += 1
+        if self.driver_pages >= self.pages_per_driver:
+            self.recycle()
+            return
+        rss = self.driver_rss_mb()
+        if rss is not None and rss > self.max_driver_rss_mb:
+            print(f"Browser uses {rss:.0f} MB; recycling the driver")
+            self.recycle()
+
+    def driver_rss_mb(self):
+        service = getattr(self.driver, 'service', None)
+        process = getattr(service, 'process', None)
+        return process_tree_rss_mb(process.pid) if process is not None else None
+
+    def recycle(self):
+        if self.driver is not None:
+            self.quit_driver()
+            self.stats['recycles'] += 1
+
+    def quit_driver(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing driver: {e}")
+        self.driver = None
+
+    def close(self):
+        if self.driver is not None:
+            self.quit_driver()
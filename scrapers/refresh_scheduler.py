@@ -0,0 +1,262 @@
+"""Keep the winmasters odds fresh, refreshing the matches that need it most first.
+
+Instead of re-scraping every match in one run, the scheduler keeps a priority
+queue of match pages keyed by when each is next due. A match's refresh
+interval shrinks as its kickoff approaches and as its odds move: the interval
+is the time to kickoff divided by KICKOFF_DIVISOR (DEFAULT_INTERVAL when the
+kickoff is unknown), divided again by 1 + VOLATILITY_WEIGHT * volatility, and
+clamped to [min_interval, max_interval]. Volatility is a moving average of the
+share of a match's prices that changed between its last two scrapes.
+
+All pages go through one browser (see page_fetcher.PageFetcher) under a global
+budget of pages per hour, so a soon-to-start, fast-moving match is refreshed
+every few minutes while a quiet match next week waits hours, at the same total
+scrape cost. Matches drop out at kickoff. The odds file is republished
+atomically (at most every publish_interval seconds) once every match has been
+scraped once, and each refresh is recorded in the odds history. The match list
+is re-read from the tournament page every discover_interval seconds.
+
+Usage:
+    python scrapers/refresh_scheduler.py --pages-per-hour 120
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# odds_history and odds_stream live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from odds_history import iter_prices, parse_time, record_scrape
+from odds_stream import write_matches
+
+import winamsters_eul_match_getter as match_getter
+from page_fetcher import PageFetcher
+from winmasters_scraper import DEAD_LETTER_FILE, ODDS_FILE, fetch_page_source, make_driver, parse_source
+
+# Interval while the kickoff is unknown
+DEFAULT_INTERVAL = 30 * 60
+# A match two days out is refreshed every 4 hours (capped by max_interval), one an hour out every 5 minutes
+KICKOFF_DIVISOR = 12
+# A match whose prices all move between scrapes is refreshed 1 + VOLATILITY_WEIGHT times as often
+VOLATILITY_WEIGHT = 3.0
+# Weight of the latest scrape in the volatility moving average
+VOLATILITY_ALPHA = 0.5
+
+
+def keyed_prices(match):
+    """{(market, group, outcome, occurrence): odds}; an outcome can repeat within a group"""
+    seen = collections.Counter()
+    prices = {}
+    for _, market, group, outcome, odds in iter_prices([match]):
+        key = (market, group, outcome)
+        prices[key + (seen[key],)] = odds
+        seen[key] += 1
+    return prices
+
+
+def price_changes(previous, current):
+    """Share of the prices two scrapes of a match have in common that changed"""
+    old = keyed_prices(previous)
+    common = changed = 0
+    for key, odds in keyed_prices(current).items():
+        last = old.get(key)
+        if last is not None:
+            common += 1
+            changed += last != odds
+    return changed / common if common else 0.0
+
+
+class ScheduledMatch:
+    """A match page in the refresh queue"""
+
+    def __init__(self, url, kickoff=None):
+        self.url = url
+        self.kickoff = kickoff
+        self.due = None
+        self.last_refresh = None
+        self.volatility = 0.0
+        self.match = None
+
+
+class RefreshScheduler:
+    """Priority queue of match pages ordered by when they are next due"""
+
+    def __init__(self, min_interval=120, max_interval=4 * 3600):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.entries = {}
+        self.heap = []
+        # Tie-breaker so entries never get compared
+        self.counter = itertools.count()
+
+    def interval(self, entry, now):
+        if entry.kickoff is None:
+            base = DEFAULT_INTERVAL
+        else:
+            base = (entry.kickoff - now) / KICKOFF_DIVISOR
+        base /= 1.0 + VOLATILITY_WEIGHT * entry.volatility
+        return min(max(base, self.min_interval), self.max_interval)
+
+    def schedule(self, entry, due):
+        # Earlier heap items of the entry become stale; next_due skips them
+        entry.due = due
+        # Sooner kickoffs go first among matches due at the same time
+        heapq.heappush(self.heap, (due, entry.kickoff or float('inf'), next(self.counter), entry.url))
+
+    def update_matches(self, kickoffs, now):
+        """Sync the queue with the current match list ({url: kickoff or None}); new matches are due now"""
+        for url in list(self.entries):
+            if url not in kickoffs:
+                del self.entries[url]
+        for url, kickoff in kickoffs.items():
+            if kickoff is not None and kickoff <= now:
+                continue
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = self.entries[url] = ScheduledMatch(url, kickoff)
+                self.schedule(entry, now)
+            elif kickoff != entry.kickoff:
+                entry.kickoff = kickoff
+                if entry.last_refresh is not None:
+                    self.schedule(entry, entry.last_refresh + self.interval(entry, now))
+
+    def drop_started(self, now):
+        """Remove matches that have kicked off; their pre-match odds are no longer offered"""
+        started = [url for url, entry in self.entries.items()
+                   if entry.kickoff is not None and entry.kickoff <= now]
+        for url in started:
+            del self.entries[url]
+        return started
+
+    def next_due(self):
+        """The entry due soonest, or None when the queue is empty; stale heap items are skipped"""
+        while self.heap:
+            due, _, _, url = self.heap[0]
+            entry = self.entries.get(url)
+            if entry is not None and entry.due == due:
+                return entry
+            heapq.heappop(self.heap)
+        return None
+
+    def refreshed(self, entry, match, now):
+        """Record a scrape of the entry (None when it failed) and schedule its next refresh"""
+        if match is not None:
+            if entry.match is not None:
+                change = price_changes(entry.match, match)
+                entry.volatility = VOLATILITY_ALPHA * change + (1 - VOLATILITY_ALPHA) * entry.volatility
+            entry.match = match
+        entry.last_refresh = now
+        self.schedule(entry, now + self.interval(entry, now))
+
+    def all_scraped(self):
+        return all(entry.last_refresh is not None for entry in self.entries.values())
+
+    def matches(self):
+        """Latest scraped match objects, soonest kickoff first"""
+        entries = sorted(self.entries.values(), key=lambda e: e.kickoff or float('inf'))
+        return [entry.match for entry in entries if entry.match is not None]
+
+
+def read_match_list():
+    """{url: kickoff unix seconds or None} from the match getter's files"""
+    with open(match_getter.MATCH_URLS_FILE, 'r', encoding='utf-8') as f:
+        urls = json.load(f)
+    kickoffs = {}
+    if os.path.exists(match_getter.KICKOFFS_FILE):
+        with open(match_getter.KICKOFFS_FILE, 'r', encoding='utf-8') as f:
+            kickoffs = json.load(f)
+    match_list = {}
+    for url in urls:
+        try:
+            match_list[url] = parse_time(kickoffs[url]) if url in kickoffs else None
+        except ValueError:
+            match_list[url] = None
+    return match_list
+
+
+def discover():
+    """Re-read the tournament page; keeps the previous match list if it comes back empty"""
+    matches = match_getter.fetch_matches(match_getter.TOURNAMENT_URL)
+    if matches:
+        match_getter.save_matches(matches)
+    return read_match_list()
+
+
+def run(pages_per_hour=120, min_interval=120, max_interval=4 * 3600, publish_interval=60,
+        discover_interval=3600, deadline=45.0, attempts=3):
+    scheduler = RefreshScheduler(min_interval, max_interval)
+    page_fetcher = PageFetcher(make_driver, fetch_page_source, deadline=deadline, max_attempts=attempts)
+    # The browser budget: pages are fetched at least this far apart
+    spacing = 3600.0 / pages_per_hour
+    next_slot = last_publish = time.time()
+    last_discovery = None
+    dirty = False
+    # Pages whose last refresh failed every attempt, by URL
+    failed = {}
+    try:
+        while True:
+            now = time.time()
+            if last_discovery is None:
+                scheduler.update_matches(read_match_list(), now)
+                last_discovery = now
+            elif now - last_discovery >= discover_interval:
+                scheduler.update_matches(discover(), now)
+                # The tournament page load comes out of the browser budget too
+                last_discovery = now = time.time()
+                next_slot = now + spacing
+            for url in scheduler.drop_started(now):
+                print(f"Kicked off, no longer refreshed: {url[:100]}")
+                dirty = True
+            if dirty and scheduler.all_scraped() and now - last_publish >= publish_interval:
+                count = write_matches(ODDS_FILE, scheduler.matches())
+                print(f"Published {count} matches to {ODDS_FILE}")
+                last_publish, dirty = now, False
+            entry = scheduler.next_due()
+            wake = min(max(entry.due, next_slot) if entry else float('inf'),
+                       last_discovery + discover_interval, last_publish + publish_interval if dirty else float('inf'))
+            if wake > now:
+                time.sleep(wake - now)
+                continue
+            next_slot = now + spacing
+            result = page_fetcher.fetch(entry.url)
+            match = parse_source(*result) if result is not None else None
+            now = time.time()
+            scheduler.refreshed(entry, match, now)
+            if result is None:
+                failed[entry.url] = page_fetcher.dead_letters.pop()
+            else:
+                failed.pop(entry.url, None)
+            if match is not None:
+                record_scrape([match], 'winmasters')
+                dirty = True
+                kickoff = f", kickoff in {(entry.kickoff - now) / 60:.0f} min" if entry.kickoff else ""
+                print(f"Refreshed {match['match_title']} (volatility {entry.volatility:.2f}{kickoff}); "
+                      f"next in {(entry.due - now) / 60:.1f} min")
+    except KeyboardInterrupt:
+        print("Stopping the refresh scheduler")
+    finally:
+        page_fetcher.close()
+        if dirty and scheduler.all_scraped():
+            write_matches(ODDS_FILE, scheduler.matches())
+        with open(DEAD_LETTER_FILE, 'w', encoding='utf-8') as f:
+            json.dump(list(failed.values()), f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Continuously refresh winmasters odds, near-kickoff and fast-moving matches first")
+    arg_parser.add_argument("--pages-per-hour", type=float, default=120, help="global browser budget (default: 120)")
+    arg_parser.add_argument("--min-interval", type=float, default=120, help="shortest refresh interval in seconds (default: 120)")
+    arg_parser.add_argument("--max-interval", type=float, default=4 * 3600, help="longest refresh interval in seconds (default: 14400)")
+    arg_parser.add_argument("--publish-interval", type=float, default=60, help="seconds between odds file updates (default: 60)")
+    arg_parser.add_argument("--discover-interval", type=float, default=3600,
+                            help="seconds between re-reads of the tournament's match list (default: 3600)")
+    arg_parser.add_argument("--deadline", type=float, default=45.0, help="seconds allowed per page attempt (default: 45)")
+    arg_parser.add_argument("--attempts", type=int, default=3, help="attempts per page (default: 3)")
+    args = arg_parser.parse_args()
+    run(args.pages_per_hour, args.min_interval, args.max_interval, args.publish_interval,
+        args.discover_interval, args.deadline, args.attempts)
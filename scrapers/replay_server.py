@@ -0,0 +1,204 @@
+"""Local HTTP server that replays recorded page responses, for offline fetch testing.
+
+A replay directory holds the recorded bodies and a responses.json index:
+    [{"url": "https://www.example.gr/match/1", "file": "response_0.html",
+      "headers": {"Content-Type": "text/html; charset=utf-8", "ETag": "\"...\""}}]
+Responses are served at the recorded URL's path and query, over HTTP/1.1
+keep-alive, with an ETag (recorded, or a hash of the body) and a Last-Modified,
+and answered with 304 Not Modified to matching conditional requests, like the
+live sites. --latency adds a fixed delay per response and --connect-latency
+one per new connection, standing in for the network and the TCP/TLS handshake.
+
+Record a directory with `winmasters_scraper.py --fetch http --record-http DIR`
+(see http_fetcher.HttpFetcher), or serve the benchmark fixtures' pages directly
+with --fixtures (each at /fixtures/<index>).
+
+Usage:
+    python scrapers/replay_server.py --dir recordings/winmasters --port 8765
+    python scrapers/replay_server.py --fixtures benchmarks/fixtures.json --latency 50
+"""
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+INDEX_FILE = 'responses.json'
+# Response headers worth recording and replaying
+REPLAYED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+def url_key(url):
+    """Path and query of a URL, which is what the replay server matches on"""
+    parts = urlsplit(url)
+    return (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+
+class Recorder:
+    """Save HTTP responses as a replay directory; safe to use from several threads"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / INDEX_FILE
+        self.entries = {}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = {entry['url']: entry for entry in json.load(f)}
+        self.lock = threading.Lock()
+
+    def record(self, url, body, headers):
+        with self.lock:
+            entry = self.entries.get(url) or {'url': url, 'file': f'response_{len(self.entries)}.html'}
+            entry['headers'] = {name: headers[name] for name in REPLAYED_HEADERS if name in headers}
+            self.entries[url] = entry
+            with open(self.directory / entry['file'], 'wb') as f:
+                f.write(body)
+            tmp_file = f'{self.index_path}.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(list(self.entries.values()), f, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, self.index_path)
+
+
+class Response:
+    """A recorded response, with the validators a conditional request is checked against"""
+
+    def __init__(self, body, headers, mtime):
+        self.body = body
+        self.headers = dict(headers)
+        self.headers.setdefault('Content-Type', 'text/html; charset=utf-8')
+        self.headers.setdefault('ETag', '"%s"' % hashlib.sha1(body).hexdigest())
+        self.headers.setdefault('Last-Modified', email.utils.formatdate(mtime, usegmt=True))
+        self.last_modified = email.utils.parsedate_to_datetime(self.headers['Last-Modified']).timestamp()
+
+    def not_modified(self, if_none_match, if_modified_since):
+        if if_none_match is not None:
+            return self.headers['ETag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if if_modified_since is not None:
+            try:
+                return email.utils.parsedate_to_datetime(if_modified_since).timestamp() >= self.last_modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def load_directory(directory):
+    """{path and query: Response} from a replay directory"""
+    directory = Path(directory)
+    with open(directory / INDEX_FILE, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    responses = {}
+    for entry in entries:
+        path = directory / entry['file']
+        responses[url_key(entry['url'])] = Response(path.read_bytes(), entry.get('headers', {}), path.stat().st_mtime)
+    return responses
+
+
+def load_fixtures(manifest_path):
+    """{/fixtures/<index>: Response} for the pages of a scraper benchmark manifest"""
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    responses = {}
+    for index, entry in enumerate(entries):
+        path = manifest_path.parent / entry['page']
+        responses[f'/fixtures/{index}'] = Response(path.read_bytes(), {}, path.stat().st_mtime)
+    return responses
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def do_GET(self):
+        self.replay(send_body=True)
+
+    def do_HEAD(self):
+        self.replay(send_body=False)
+
+    def replay(self, send_body):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        response = server.responses.get(self.path)
+        if response is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if response.not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')):
+            self.send_response(304)
+            self.send_header('ETag', response.headers['ETag'])
+            self.end_headers()
+            return
+        self.send_response(200)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(response.body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Serve {path and query: Response} on (host, port); port 0 picks a free port"""
+    daemon_threads = True
+
+    def __init__(self, responses, host='127.0.0.1', port=0, latency=0.0, connect_latency=0.0, verbose=False):
+        super().__init__((host, port), ReplayHandler)
+        self.responses = responses
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a daemon thread; returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True, name='replay-server')
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve recorded page responses for offline fetch testing")
+    arg_parser.add_argument("--dir", action="append", default=[], help="replay directory with a responses.json (repeatable)")
+    arg_parser.add_argument("--fixtures", action="append", default=[], help="scraper benchmark manifest whose pages to serve")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="milliseconds to wait before each response")
+    arg_parser.add_argument("--connect-latency", type=float, default=0.0, help="milliseconds to wait on each new connection")
+    arg_parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = arg_parser.parse_args()
+    responses = {}
+    for directory in args.dir:
+        responses.update(load_directory(directory))
+    for manifest in args.fixtures:
+        responses.update(load_fixtures(manifest))
+    if not responses:
+        arg_parser.error("nothing to serve; pass --dir or --fixtures")
+    server = ReplayServer(responses, args.host, args.port, args.latency / 1000, args.connect_latency / 1000, args.verbose)
+    print(f"Replaying {len(responses)} responses at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,269 @@
+"""Scrape job queue shared by a coordinator and any number of worker processes.
+
+Jobs (one match URL each, grouped in a batch per scrape run) live in a SQLite
+database (odds/scrape_queue.db, or TSIPSTER_SCRAPE_QUEUE). A worker claims a
+job with a lease: the job is its own until the lease expires, and the worker
+renews it with heartbeats while it fetches. A job whose worker dies is claimed
+again by another worker once the lease runs out; a job that fails is retried
+after a backoff, and both become failed (dead-lettered) after max_attempts.
+Claims run in an IMMEDIATE transaction, so two workers never get the same job.
+
+Workers on the same machine open the database directly. Workers on other
+machines talk to the coordinator's QueueServer over HTTP (RemoteQueue has the
+same worker-side methods), so no broker is needed and the database never sits
+on a network filesystem.
+
+Usage:
+    queue = ScrapeQueue()
+    queue.enqueue('run-1', urls)
+    job = queue.claim('worker-a')
+    queue.complete(job['id'], 'worker-a', match_object)
+"""
+import hmac
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+DEFAULT_PATH = 'odds/scrape_queue.db'
+# Requests to the queue server carry this header when TSIPSTER_QUEUE_TOKEN is set
+TOKEN_HEADER = 'X-Queue-Token'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (batch, url)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, available_at);
+"""
+
+def default_path():
+    return os.environ.get('TSIPSTER_SCRAPE_QUEUE', DEFAULT_PATH)
+
+
+class ScrapeQueue:
+    """SQLite-backed job queue with leases, heartbeats, retries and dead letters"""
+
+    def __init__(self, path=None, lease=120.0, max_attempts=3, retry_delay=30.0):
+        self.path = path or default_path()
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        # Autocommit mode; claims open their own IMMEDIATE transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def enqueue(self, batch, urls):
+        """Add a batch of URLs (duplicates within a batch are added once); returns the number added"""
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN')
+            cursor = conn.executemany('INSERT OR IGNORE INTO jobs (batch, url) VALUES (?, ?)',
+                                      [(batch, url) for url in urls])
+            conn.execute('COMMIT')
+            return cursor.rowcount
+
+    def claim(self, worker, batch=None):
+        """Lease the oldest available job (of `batch`, if given) to `worker`.
+
+        Returns {'id', 'batch', 'url', 'attempts'}, or None when no job is available.
+        """
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Leases that ran out on their last attempt are dead-lettered instead of retried
+                conn.execute("UPDATE jobs SET state = 'failed', error = 'lease expired', worker = NULL "
+                             "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                             (now, self.max_attempts))
+                row = conn.execute(
+                    "SELECT id, batch, url, attempts FROM jobs "
+                    "WHERE ((state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?)) "
+                    "AND (? IS NULL OR batch = ?) ORDER BY id LIMIT 1", (now, now, batch, batch)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, "
+                                 "attempts = attempts + 1 WHERE id = ?", (worker, now + self.lease, row[0]))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        return {'id': row[0], 'batch': row[1], 'url': row[2], 'attempts': row[3] + 1}
+
+    def heartbeat(self, job_id, worker):
+        """Renew a lease; False when the job is no longer this worker's (its lease expired and was taken)"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                                  (time.time() + self.lease, job_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """Store a job's parsed match; False when the job is no longer this worker's"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (json.dumps(result, ensure_ascii=False), job_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Give a job back for a retry after retry_delay, or dead-letter it after max_attempts"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "available_at = ?, error = ?, worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (self.max_attempts, time.time() + self.retry_delay, str(error)[:500], job_id, worker))
+            return cursor.rowcount == 1
+
+    def progress(self, batch):
+        """{state: number of jobs} for a batch"""
+        with closing(self.connect()) as conn:
+            return dict(conn.execute('SELECT state, COUNT(*) FROM jobs WHERE batch = ? GROUP BY state', (batch,)))
+
+    def results(self, batch):
+        """Parsed matches of a batch's finished jobs, in enqueue order"""
+        with closing(self.connect()) as conn:
+            for (result,) in conn.execute("SELECT result FROM jobs WHERE batch = ? AND state = 'done' ORDER BY id",
+                                          (batch,)):
+                yield json.loads(result)
+
+    def failures(self, batch):
+        """Dead letters of a batch: URLs that failed every attempt, with their last error"""
+        with closing(self.connect()) as conn:
+            return [{'url': url, 'error': error, 'attempts': attempts}
+                    for url, error, attempts in conn.execute(
+                        "SELECT url, error, attempts FROM jobs WHERE batch = ? AND state = 'failed' ORDER BY id",
+                        (batch,))]
+
+
+class QueueHandler(BaseHTTPRequestHandler):
+    """JSON endpoints for remote workers: POST /claim, /heartbeat, /complete, /fail, /progress"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        queue = self.server.queue
+        token = self.server.token
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode(), token.encode()):
+                return self.reply(403, {'error': 'bad queue token'})
+            if self.path == '/progress':
+                return self.reply(200, {'progress': queue.progress(body['batch'])})
+            worker = body['worker']
+            if self.path == '/claim':
+                return self.reply(200, {'job': queue.claim(worker, body.get('batch'))})
+            if self.path == '/heartbeat':
+                return self.reply(200, {'ok': queue.heartbeat(body['id'], worker)})
+            if self.path == '/complete':
+                return self.reply(200, {'ok': queue.complete(body['id'], worker, body['result'])})
+            if self.path == '/fail':
+                return self.reply(200, {'ok': queue.fail(body['id'], worker, body['error'])})
+            return self.reply(404, {'error': f'unknown endpoint {self.path}'})
+        except (KeyError, ValueError) as e:
+            return self.reply(400, {'error': f'bad request: {e}'})
+        except sqlite3.Error as e:
+            return self.reply(500, {'error': str(e)})
+
+    def reply(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class QueueServer(ThreadingHTTPServer):
+    """Expose a ScrapeQueue to workers on other machines.
+
+    Completed jobs are published as the odds file, so the server refuses to
+    listen beyond loopback without a token.
+    """
+    daemon_threads = True
+
+    def __init__(self, queue, host='127.0.0.1', port=8766, token=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"refusing to serve the scrape queue on {host} without a token; set TSIPSTER_QUEUE_TOKEN")
+        super().__init__((host, port), QueueHandler)
+        self.queue = queue
+        self.token = token
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True, name='queue-server')
+        thread.start()
+        return thread
+
+
+class RemoteQueue:
+    """Client for a coordinator's QueueServer, with the worker-side methods of ScrapeQueue"""
+
+    def __init__(self, base_url, token=None, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def post(self, endpoint, **body):
+        response = self.session.post(f'{self.base_url}/{endpoint}', json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, worker, batch=None):
+        return self.post('claim', worker=worker, batch=batch)['job']
+
+    def heartbeat(self, job_id, worker):
+        return self.post('heartbeat', id=job_id, worker=worker)['ok']
+
+    def complete(self, job_id, worker, result):
+        return self.post('complete', id=job_id, worker=worker, result=result)['ok']
+
+    def fail(self, job_id, worker, error):
+        return self.post('fail', id=job_id, worker=worker, error=str(error))['ok']
+
+    def progress(self, batch):
+        return self.post('progress', batch=batch)['progress']
+
+
+def open_queue(location, token=None, lease=120.0, max_attempts=3):
+    """A RemoteQueue for an http(s):// URL, else a ScrapeQueue on that database path (None: the default)"""
+    if location and location.startswith(('http://', 'https://')):
+        return RemoteQueue(location, token)
+    return ScrapeQueue(location, lease=lease, max_attempts=max_attempts)
@@ -3,163 +3,159 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
-import re
 import json
 import time
+import sys
+from pathlib import Path
 
-# Initialize Selenium WebDriver
-driver = webdriver.Chrome()
-driver.get("https://www.stoiximan.gr/apodoseis/olybiakos-bodo-glimt/64219187/?bt=13")
+# odds_history and odds_stream live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from odds_history import record_scrape
+from odds_stream import write_matches
 
-# Wait for the page to load
-WebDriverWait(driver, 10).until(
-    EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-marketid]"))
-)
+from market_grouping import group_outcomes
 
-# Check for and close any popup ads
-try:
-    # Check for landing page modal
-    modal = WebDriverWait(driver, 3).until(
-        EC.presence_of_element_located((By.ID, "landing-page-modal"))
+# Read by bet_suggestor, which joins it with the other bookmakers' odds
+ODDS_FILE = "odds/stoiximan/odds.json"
+DEFAULT_URL = "https://www.stoiximan.gr/apodoseis/olybiakos-bodo-glimt/64219187/?bt=13"
+
+def fetch_page_source(url):
+    """Load a match page with Selenium, expand every market and return its HTML"""
+    # Initialize Selenium WebDriver
+    driver = webdriver.Chrome()
+    driver.get(url)
+
+    # Wait for the page to load
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-marketid]"))
     )
+
+    # Check for and close any popup ads
+    try:
+        # Check for landing page modal
+        modal = WebDriverWait(driver, 3).until(
+            EC.presence_of_element_located((By.ID, "landing-page-modal"))
+        )
     
-    # Try to find and click close button
-    close_button = modal.find_element(By.CSS_SELECTOR, "button.button-close")
-    close_button.click()
-    print("Closed popup ad")
+        # Try to find and click close button
+        close_button = modal.find_element(By.CSS_SELECTOR, "button.button-close")
+        close_button.click()
+        print("Closed popup ad")
     
-    # Wait for modal to disappear
-    WebDriverWait(driver, 3).until(
-        EC.invisibility_of_element(modal)
-    )
-except:
-    # If no popup or failed to close, remove it using JavaScript
-    try:
-        driver.execute_script("""
-            var elements = document.querySelectorAll('#landing-page-modal');
-            for(var i=0; i<elements.length; i++){
-                elements[i].remove();
-            }
+        # Wait for modal to disappear
+        WebDriverWait(driver, 3).until(
+            EC.invisibility_of_element(modal)
+        )
+    except:
+        # If no popup or failed to close, remove it using JavaScript
+        try:
+            driver.execute_script("""
+                var elements = document.querySelectorAll('#landing-page-modal');
+                for(var i=0; i<elements.length; i++){
+                    elements[i].remove();
+                }
             
-            // Also remove overlay if present
-            var overlays = document.querySelectorAll('.sb-modal-overlay');
-            for(var i=0; i<overlays.length; i++){
-                overlays[i].remove();
-            }
-        """)
-        print("Removed popup using JavaScript")
+                // Also remove overlay if present
+                var overlays = document.querySelectorAll('.sb-modal-overlay');
+                for(var i=0; i<overlays.length; i++){
+                    overlays[i].remove();
+                }
+            """)
+            print("Removed popup using JavaScript")
+        except:
+            print("No popup ads found or couldn't remove")
+
+    # Find all market sections
+    market_divs = driver.find_elements(By.CSS_SELECTOR, "div[data-marketid]")
+
+    # Open all closed market sections
+    total_divs = len(market_divs)
+    for i, market_div in enumerate(market_divs):
+        try:
+            # Locate the arrow SVG within the market div
+            arrow = market_div.find_element(By.CSS_SELECTOR, 
+                "svg.sb-arrow.tw-icon-xs.push-right.tw-icon.tw-fill-n-48-slate.dark\\:tw-fill-n-75-smokey.tw-cursor-pointer")
+            # Check if the arrow has the 'sb-arrow--collapsed' class (indicating it's closed)
+            if "sb-arrow--collapsed" not in arrow.get_attribute("class"):
+                arrow.click()
+                # Wait for the selections to load after clicking
+                WebDriverWait(driver, 5).until(
+                    EC.presence_of_element_located((By.CLASS_NAME, "selections"))
+                )
+                # Use a longer delay for the last 10% of sections
+                if i >= int(total_divs * 0.9):
+                    time.sleep(0.2)
+                else:
+                    time.sleep(0.01)
+        except:
+            # Skip if no arrow is found or it's already open
+            continue
+
+    # Get the full HTML content after all sections are expanded
+    html_content = driver.page_source
+
+    # Close the WebDriver as we no longer need Selenium
+    driver.quit()
+
+    return html_content
+
+def parse_source(html_content):
+    """Parse a saved match page into the standard match/markets/groups/outcomes list"""
+    # Use BeautifulSoup to parse the HTML
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Extract match title
+    try:
+        match_title = soup.find('h1').text.strip()
     except:
-        print("No popup ads found or couldn't remove")
+        match_title = "Ολυμπιακός vs Μπόντο Γκλιμτ"  # Fallback
 
-# Find all market sections
-market_divs = driver.find_elements(By.CSS_SELECTOR, "div[data-marketid]")
+    # Extract markets and outcomes using BeautifulSoup
+    markets = []
+    market_divs = soup.select('div[data-marketid]')
 
-# Open all closed market sections
-total_divs = len(market_divs)
-for i, market_div in enumerate(market_divs):
-    try:
-        # Locate the arrow SVG within the market div
-        arrow = market_div.find_element(By.CSS_SELECTOR, 
-            "svg.sb-arrow.tw-icon-xs.push-right.tw-icon.tw-fill-n-48-slate.dark\\:tw-fill-n-75-smokey.tw-cursor-pointer")
-        # Check if the arrow has the 'sb-arrow--collapsed' class (indicating it's closed)
-        if "sb-arrow--collapsed" not in arrow.get_attribute("class"):
-            arrow.click()
-            # Wait for the selections to load after clicking
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "selections"))
-            )
-            # Use a longer delay for the last 10% of sections
-            if i >= int(total_divs * 0.9):
-                time.sleep(0.2)
-            else:
-                time.sleep(0.01)
-    except:
-        # Skip if no arrow is found or it's already open
-        continue
-
-# Get the full HTML content after all sections are expanded
-html_content = driver.page_source
-
-# Close the WebDriver as we no longer need Selenium
-driver.quit()
-
-# Now use BeautifulSoup to parse the HTML
-soup = BeautifulSoup(html_content, 'html.parser')
-
-# Extract match title
-try:
-    match_title = soup.find('h1').text.strip()
-except:
-    match_title = "Ολυμπιακός vs Μπόντο Γκλιμτ"  # Fallback
-
-# Define markets that require grouping
-grouped_markets = [
-    "Γκολ Over/Under", "Γκολ Over/Under, 1ο Ημίχρονο", "Ασιατικό Χάντικαπ",
-    "Ασιατικό Χάντικαπ, 1ο Ημίχρονο", "Κόρνερ Over/Under", "Κάρτες Over/Under",
-    "Χάντικαπ"
-]
-
-# Extract markets and outcomes using BeautifulSoup
-markets = []
-market_divs = soup.select('div[data-marketid]')
-
-for market_div in market_divs:
-    # Get market name
-    market_name_elem = market_div.select_one('div.tw-self-center')
-    if not market_name_elem:
-        continue
+    for market_div in market_divs:
+        # Get market name
+        market_name_elem = market_div.select_one('div.tw-self-center')
+        if not market_name_elem:
+            continue
     
-    market_name = market_name_elem.text.strip()
+        market_name = market_name_elem.text.strip()
     
-    # Get all selections within the market
-    selections = market_div.select('div.selections__selection')
-    if not selections:
-        continue
+        # Get all selections within the market
+        selections = market_div.select('div.selections__selection')
+        if not selections:
+            continue
     
-    outcomes = []
-    for selection in selections:
-        title_elem = selection.select_one('span.selection-horizontal-button__title')
-        odds_elem = selection.select_one('span.tw-text-s.tw-leading-s.tw-font-bold')
+        outcomes = []
+        for selection in selections:
+            title_elem = selection.select_one('span.selection-horizontal-button__title')
+            odds_elem = selection.select_one('span.tw-text-s.tw-leading-s.tw-font-bold')
         
-        if title_elem and odds_elem:
-            outcome_name = title_elem.text.strip()
-            odds = odds_elem.text.strip()
-            outcomes.append({"outcome": outcome_name, "odds": odds})
+            if title_elem and odds_elem:
+                outcome_name = title_elem.text.strip()
+                odds = odds_elem.text.strip()
+                outcomes.append({"outcome": outcome_name, "odds": odds})
     
-    # Handle grouping based on market type
-    if market_name in grouped_markets:
-        groups_dict = {}
-        for outcome in outcomes:
-            # Extract line (e.g., "0.5" from "Over 0.5" or "-1.5" from "-1.5")
-            match = re.search(r"(Over|Under|\+|-)?\s*([\d.]+)", outcome["outcome"])
-            if match:
-                line = match.group(2) if match.group(1) in ["Over", "Under"] else outcome["outcome"]
-                if line not in groups_dict:
-                    groups_dict[line] = []
-                groups_dict[line].append(outcome)
-            elif "Ισοπαλία" in outcome["outcome"] or market_name == "Χάντικαπ":
-                # Handle Handicap markets with format like "0:1"
-                handicap_match = re.search(r"(\d+:\d+)", market_div.text)
-                line = handicap_match.group(1) if handicap_match else "unknown"
-                if line not in groups_dict:
-                    groups_dict[line] = []
-                groups_dict[line].append(outcome)
-            else:
-                # Fallback for unexpected formats
-                groups_dict["default"] = groups_dict.get("default", []) + [outcome]
-
-        market_groups = [
-            {"group_title": line, "outcomes": outcomes}
-            for line, outcomes in groups_dict.items()
-        ]
-    else:
-        # Single group for markets without lines
-        market_groups = [{"group_title": None, "outcomes": outcomes}]
-
-    markets.append({"market_name": market_name, "groups": market_groups})
-
-# Construct the final JSON
-data = [{"match_title": match_title, "markets": markets}]
-
-# Output the JSON
-print(json.dumps(data, ensure_ascii=False, indent=4))
\ No newline at end of file
+        # Split line markets into one group per line (see market_grouping.py)
+        market_groups = group_outcomes(market_name, outcomes, lambda: market_div.text)
+
+        markets.append({"market_name": market_name, "groups": market_groups})
+
+    # Construct the final JSON
+    data = [{"match_title": match_title, "markets": markets}]
+
+    return data
+
+def main(url=DEFAULT_URL):
+    html_content = fetch_page_source(url)
+    data = parse_source(html_content)
+
+    # Output the JSON
+    print(json.dumps(data, ensure_ascii=False, indent=4))
+
+    write_matches(ODDS_FILE, data)
+    record_scrape(data, 'stoiximan')
+
+if __name__ == "__main__":
+    main()
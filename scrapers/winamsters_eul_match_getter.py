@@ -9,6 +9,20 @@ from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 import time
 
+# Europa League tournament page
+TOURNAMENT_URL = (
+    "https://www.winmasters.gr/el/sports/i/tournament-location/%CF%80%CE%BF%CE%B4%CF%8C%CF%83%CF%86%CE%B1%CE%B9%CF%81%CE%BF/1/%CE%B5%CF%85%CF%81%CF%8E%CF%80%CE%B7/67/europa-league-2024-2025/239341156955492352"
+)
+MATCH_URLS_FILE = "matches/winmasters/uel/match_urls.json"
+# Kickoff (ISO 8601 or unix seconds) per match URL, read by refresh_scheduler.py
+KICKOFFS_FILE = "matches/winmasters/uel/kickoffs.json"
+
+def event_kickoff(link):
+    """The kickoff shown next to a match link, when its event item has a machine-readable <time>"""
+    item = link.find_parent(class_="EventItem")
+    time_elem = item.find("time") if item else None
+    return time_elem.get("datetime") if time_elem else None
+
 def fetch_match_urls(tournament_url):
     """
     Fetches all match URLs from a given tournament page.
@@ -19,6 +33,15 @@ def fetch_match_urls(tournament_url):
     Returns:
         list: A list of match URLs.
     """
+    return [url for url, _ in fetch_matches(tournament_url)]
+
+def fetch_matches(tournament_url):
+    """
+    Fetches all match URLs from a given tournament page, with their kickoffs where the page shows them.
+    
+    Returns:
+        list: (url, kickoff) pairs; kickoff is the <time> element's datetime or None.
+    """
     try:
         # Set up Chrome options for headless browsing
         chrome_options = Options()
@@ -66,13 +89,13 @@ def fetch_match_urls(tournament_url):
             return []
         
         # Extract the href attributes (absolute URLs)
-        match_urls = [link["href"] for link in match_links if "href" in link.attrs]
-        print(f"Found {len(match_urls)} match URLs.")
+        matches = [(link["href"], event_kickoff(link)) for link in match_links if "href" in link.attrs]
+        print(f"Found {len(matches)} match URLs.")
         
         # Clean up: close the WebDriver
         driver.quit()
         
-        return match_urls
+        return matches
     
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -80,24 +103,27 @@ def fetch_match_urls(tournament_url):
             driver.quit()
         return []
 
+def save_matches(matches):
+    """Write the match URLs (and the kickoffs found) for the scraper and the refresh scheduler"""
+    with open(MATCH_URLS_FILE, "w", encoding="utf-8") as f:
+        json.dump([url for url, _ in matches], f, ensure_ascii=False, indent=4)
+    kickoffs = {url: kickoff for url, kickoff in matches if kickoff}
+    with open(KICKOFFS_FILE, "w", encoding="utf-8") as f:
+        json.dump(kickoffs, f, ensure_ascii=False, indent=4)
+    return kickoffs
+
 if __name__ == "__main__":
-    # Example tournament URL from the provided HTML (Europa League)
-    tournament_url = (
-        "https://www.winmasters.gr/el/sports/i/tournament-location/%CF%80%CE%BF%CE%B4%CF%8C%CF%83%CF%86%CE%B1%CE%B9%CF%81%CE%BF/1/%CE%B5%CF%85%CF%81%CF%8E%CF%80%CE%B7/67/europa-league-2024-2025/239341156955492352"
-    )
-    
     # Fetch the match URLs
-    match_urls = fetch_match_urls(tournament_url)
+    matches = fetch_matches(TOURNAMENT_URL)
     
     # Display the results
-    if match_urls:
+    if matches:
         print("\nMatch URLs extracted:")
-        for idx, url in enumerate(match_urls, 1):
-            print(f"{idx}. {url}")
+        for idx, (url, kickoff) in enumerate(matches, 1):
+            print(f"{idx}. {url}" + (f" (kickoff {kickoff})" if kickoff else ""))
         
-        # Save to a JSON file for later use
-        with open("matches/winmasters/uel/match_urls.json", "w", encoding="utf-8") as f:
-            json.dump(match_urls, f, ensure_ascii=False, indent=4)
-        print("\nMatch URLs saved to 'match_urls.json'.")
+        # Save to JSON files for later use
+        kickoffs = save_matches(matches)
+        print(f"\nMatch URLs saved to '{MATCH_URLS_FILE}' ({len(kickoffs)} kickoffs to '{KICKOFFS_FILE}').")
     else:
-        print("No match URLs were extracted.")
\ No newline at end of file
+        print("No match URLs were extracted.")
@@ -6,42 +6,60 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import re
 import time
+import os
+import argparse
+import functools
+import itertools
 from queue import Queue
 from threading import Thread
+import sys
+from pathlib import Path
+
+# odds_history and odds_stream live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from odds_history import record_scrape
+from odds_stream import MatchSink, iter_matches, partial_path, publish
+from page_fetcher import PageFetcher, remaining
+from http_fetcher import HttpFetcher
+
+ODDS_FILE = "odds/winmasters/UEL_odds.json"
+# With --fetch auto, HTTP is given up once this many pages came without markets and none with them
+HTTP_MISS_LIMIT = 3
+# URLs that failed every attempt, with their last error
+DEAD_LETTER_FILE = "odds/winmasters/dead_letters.json"
 
 def truncate_url(url):
     return url[:100] + "..." if len(url) > 100 else url
 
-def fetch_page_source(driver, url):
+def fetch_page_source(driver, url, deadline):
+    """Load a match page and return (match_title, page_source); raises if the markets do not load by the deadline"""
+    print(f"Fetching {truncate_url(url)}")
+    initial_time = time.time()
+    driver.get(url)
+    print(f"Successfully retrieved the initial HTML page for {truncate_url(url)}")
+    
+    # Every wait is capped by the time left for this URL (see page_fetcher.PageFetcher)
+    WebDriverWait(driver, min(10, remaining(deadline))).until(EC.presence_of_element_located((By.ID, "SportsIframe")))
+    driver.switch_to.frame("SportsIframe")
+    
+    match_title = "Unknown Match"
     try:
-        print(f"Fetching {truncate_url(url)}")
-        initial_time = time.time()
-        driver.get(url)
-        print(f"Successfully retrieved the initial HTML page for {truncate_url(url)}")
-        
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "SportsIframe")))
-        driver.switch_to.frame("SportsIframe")
-        
-        match_title = "Unknown Match"
-        try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "MatchDetailsHeader__Participants")))
-            home_team = driver.find_element(By.CLASS_NAME, "MatchDetailsHeader__PartName--Home").text or "Home"
-            away_team = driver.find_element(By.CLASS_NAME, "MatchDetailsHeader__PartName--Away").text or "Away"
-            match_title = f"{home_team} vs {away_team}"
-            print(f"Found match: {match_title}")
-        except Exception as e:
-            print(f"Could not extract match title for {truncate_url(url)}: {e}")
-        
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "MarketContainer")))
-        source = driver.page_source
-        
-        print(f"Time to fetch {truncate_url(url)}: {time.time() - initial_time:.2f} seconds")
-        return match_title, source
+        WebDriverWait(driver, min(10, remaining(deadline))).until(EC.presence_of_element_located((By.CLASS_NAME, "MatchDetailsHeader__Participants")))
+        home_team = driver.find_element(By.CLASS_NAME, "MatchDetailsHeader__PartName--Home").text or "Home"
+        away_team = driver.find_element(By.CLASS_NAME, "MatchDetailsHeader__PartName--Away").text or "Away"
+        match_title = f"{home_team} vs {away_team}"
+        print(f"Found match: {match_title}")
     except Exception as e:
-        print(f"Error fetching {truncate_url(url)}: {e}")
-        return "Unknown Match", None
+        print(f"Could not extract match title for {truncate_url(url)}: {e}")
+    
+    WebDriverWait(driver, min(10, remaining(deadline))).until(EC.presence_of_element_located((By.CLASS_NAME, "MarketContainer")))
+    source = driver.page_source
+    
+    print(f"Time to fetch {truncate_url(url)}: {time.time() - initial_time:.2f} seconds")
+    return match_title, source
 
 def parse_source(match_title, source):
     if source is None:
@@ -122,16 +140,81 @@ def parse_source(match_title, source):
     print(f"Time to parse {match_title}: {time.time() - initial_time:.2f} seconds")
     return match_object
 
+# Numbering for recorded fixtures (shared by the parser threads)
+fixture_counter = itertools.count()
+
+def save_fixture(record_dir, match_title, source, match_object):
+    """Save a fetched page and its parsed output as a parse-benchmark fixture"""
+    index = next(fixture_counter)
+    page_name = f"match_{index}.html"
+    golden_name = f"match_{index}.json"
+    with open(os.path.join(record_dir, page_name), "w", encoding="utf-8") as f:
+        f.write(source)
+    with open(os.path.join(record_dir, golden_name), "w", encoding="utf-8") as f:
+        json.dump(match_object, f, ensure_ascii=False, indent=4)
+    return {"scraper": "winmasters", "match_title": match_title, "page": page_name, "golden": golden_name}
+
+@functools.lru_cache(maxsize=None)
+def chrome_driver_path():
+    """Resolved on the first browser start; every recycled driver reuses the same chromedriver"""
+    return ChromeDriverManager().install()
+
+def make_driver():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--log-level=3")  # suppress driver debug logs
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    return webdriver.Chrome(service=Service(chrome_driver_path()), options=chrome_options)
+
+def page_from_html(html):
+    """(match_title, html) when the served HTML already holds the markets, or None when they need the browser"""
+    if "MarketContainer" not in html:
+        return None
+    # Only the team names are needed here; parse_source builds the full tree
+    header = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(class_=re.compile("MatchDetailsHeader__PartName")))
+    home_team = header.find(class_="MatchDetailsHeader__PartName--Home")
+    away_team = header.find(class_="MatchDetailsHeader__PartName--Away")
+    if home_team is None or away_team is None:
+        return "Unknown Match", html
+    return f"{home_team.get_text(strip=True) or 'Home'} vs {away_team.get_text(strip=True) or 'Away'}", html
+
+def fetch_over_http(queue, urls, http_fetcher, page_fetcher, fallback):
+    """Queue the pages plain HTTP can serve; returns the URLs left for the browser"""
+    browser_urls = []
+    served = 0
+    for start in range(0, len(urls), http_fetcher.max_connections):
+        # Markets rendered by scripts never show up over HTTP; stop trying once that is clear
+        if fallback and not served and len(browser_urls) >= HTTP_MISS_LIMIT:
+            print(f"No markets in the first {len(browser_urls)} pages over HTTP; fetching the rest with the browser")
+            return browser_urls + urls[start:]
+        for url, html, error in http_fetcher.fetch_many(urls[start:start + http_fetcher.max_connections]):
+            page = page_from_html(html) if html is not None else None
+            if page is not None:
+                served += 1
+                queue.put(page)
+            elif fallback:
+                browser_urls.append(url)
+            else:
+                page_fetcher.dead_letter(url, error or "markets are not in the HTML", 1)
+    return browser_urls
+
 # Fetcher thread function
-def fetcher(queue, urls, driver):
+def fetcher(queue, urls, page_fetcher, http_fetcher=None, fallback=True):
+    if http_fetcher is not None:
+        urls = fetch_over_http(queue, urls, http_fetcher, page_fetcher, fallback)
     for url in urls:
-        match_title, source = fetch_page_source(driver, url)
-        queue.put((match_title, source))
+        result = page_fetcher.fetch(url)
+        # Failed URLs are dead-lettered by the page fetcher and skipped here
+        if result is not None:
+            queue.put(result)
     # Signal end of fetching (one None is sufficient; main thread adds more for each parser)
     queue.put(None)
 
 # Parser thread function
-def parser(queue, results):
+def parser(queue, sink, record_dir=None, fixtures=None):
     while True:
         item = queue.get()
         if item is None:
@@ -139,38 +222,48 @@ def parser(queue, results):
         match_title, source = item
         match_object = parse_source(match_title, source)
         if match_object:
-            results.append(match_object)
+            # Stream each match out as soon as it is parsed
+            sink.write(match_object)
+            if record_dir:
+                fixtures.append(save_fixture(record_dir, match_title, source, match_object))
+
+def write_dead_letters(dead_letters):
+    """Save the URLs that failed every attempt (an empty list clears the last run's)"""
+    with open(DEAD_LETTER_FILE, 'w', encoding='utf-8') as f:
+        json.dump(dead_letters, f, ensure_ascii=False, indent=4)
+    if dead_letters:
+        print(f"{len(dead_letters)} URLs failed every attempt; see {DEAD_LETTER_FILE}")
 
-def main():
+def main(record_dir=None, deadline=45.0, attempts=3, pages_per_driver=40, max_driver_rss_mb=1500,
+         fetch_mode='browser', http_connections=8, replay=None, record_http=None):
     # Load URLs
     with open('matches/winmasters/uel/match_urls.json', 'r', encoding='utf-8') as f:
         match_urls = json.load(f)
     
-    # Initialize queue and results list
+    # Initialize queue and the sink parsed matches stream to (see odds_stream.MatchSink)
     queue = Queue()
-    results = []
+    sink = MatchSink(ODDS_FILE)
+    fixtures = []
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
     
-    # Set up WebDriver once for all URLs
-        # In your driver setup inside main(), add these lines:
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--log-level=3")  # suppress driver debug logs
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    # Drivers are created (only once a page needs the browser), recycled and retried by the page fetcher
+    page_fetcher = PageFetcher(make_driver, fetch_page_source, deadline=deadline, max_attempts=attempts,
+                               pages_per_driver=pages_per_driver, max_driver_rss_mb=max_driver_rss_mb)
+    http_fetcher = None
+    if fetch_mode != 'browser':
+        http_fetcher = HttpFetcher(http_connections, replay_base=replay, record_dir=record_http)
     
     # Start parser threads
     num_workers = 4  # Adjust based on your system's capabilities
     parsers = []
     for _ in range(num_workers):
-        p = Thread(target=parser, args=(queue, results))
+        p = Thread(target=parser, args=(queue, sink, record_dir, fixtures))
         p.start()
         parsers.append(p)
     
     # Start fetcher thread
-    fetcher_thread = Thread(target=fetcher, args=(queue, match_urls, driver))
+    fetcher_thread = Thread(target=fetcher, args=(queue, match_urls, page_fetcher, http_fetcher, fetch_mode == 'auto'))
     fetcher_thread.start()
     
     # Wait for fetcher to complete
@@ -185,13 +278,45 @@ def main():
         p.join()
     
     # Clean up WebDriver
-    driver.quit()
+    page_fetcher.close()
+    stats = page_fetcher.stats
+    print(f"Fetched {stats['pages']} pages with the browser ({stats['retries']} retries, {stats['recycles']} driver recycles)")
+    if http_fetcher is not None:
+        http_fetcher.close()
+        stats = http_fetcher.stats
+        print(f"Made {stats['requests']} HTTP requests ({stats['not_modified']} not modified, "
+              f"{stats['bytes'] / 2**20:.1f} MB, {stats['errors']} errors)")
+    write_dead_letters(page_fetcher.dead_letters)
+    
+    # Publish the streamed matches as the odds file in one atomic rename
+    count = sink.finish()
     
-    # Save results
-    with open("odds/winmasters/UEL_odds.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
+    print(f"Processed {count} matches. Odds data saved to {ODDS_FILE}")
+    record_scrape(iter_matches(ODDS_FILE), 'winmasters')
     
-    print(f"Processed {len(results)} matches. Odds data saved to odds/UEL_odds.json")
+    if record_dir:
+        with open(os.path.join(record_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(fixtures, f, ensure_ascii=False, indent=4)
+        print(f"Recorded {len(fixtures)} page fixtures to {record_dir}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Scrape Europa League odds from winmasters")
+    arg_parser.add_argument("--record", metavar="DIR", help="also save page sources and parsed output as benchmark fixtures")
+    arg_parser.add_argument("--publish-partial", action="store_true",
+                            help=f"publish the matches an interrupted run streamed to {partial_path(ODDS_FILE)} and exit")
+    arg_parser.add_argument("--deadline", type=float, default=45.0, help="seconds allowed per page attempt (default: 45)")
+    arg_parser.add_argument("--attempts", type=int, default=3, help="attempts per URL before it is dead-lettered (default: 3)")
+    arg_parser.add_argument("--pages-per-driver", type=int, default=40, help="recycle the browser after this many pages (default: 40)")
+    arg_parser.add_argument("--max-driver-rss", type=float, default=1500, metavar="MB",
+                            help="recycle the browser once its processes use more memory than this (default: 1500)")
+    arg_parser.add_argument("--fetch", choices=["browser", "http", "auto"], default="browser",
+                            help="fetch pages with the browser, over plain HTTP, or over HTTP falling back to the browser (default: browser)")
+    arg_parser.add_argument("--http-connections", type=int, default=8, help="concurrent pooled HTTP connections (default: 8)")
+    arg_parser.add_argument("--replay", metavar="URL", help="send HTTP fetches to a replay server (see replay_server.py)")
+    arg_parser.add_argument("--record-http", metavar="DIR", help="save HTTP responses as a replay directory")
+    args = arg_parser.parse_args()
+    if args.publish_partial:
+        print(f"Published {publish(ODDS_FILE)} matches from {partial_path(ODDS_FILE)} to {ODDS_FILE}")
+    else:
+        main(args.record, args.deadline, args.attempts, args.pages_per_driver, args.max_driver_rss,
+             args.fetch, args.http_connections, args.replay, args.record_http)
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Production server for the Tsipster API.
+
+Loads bet_suggestor (odds, bet store, model and score cache) once in the master
+process and then forks gunicorn workers, which share that read-only data
+copy-on-write instead of each loading their own copy. Throughput scales with
+the number of workers rather than being limited to the single-process
+Werkzeug dev server that `python app.py` starts.
+
+Workers score with NumPy and only import torch the first time they train.
+Weights trained in one worker are saved to nn_model.pth and nn_model.npz and
+picked up by the other workers on their next request (see bet_suggestor.refresh).
+
+Usage:
+    python serve.py --workers 4 --threads 4 --bind 0.0.0.0:5000
+    python serve.py --fast-start  # bind first, load in each worker (see /readyz)
+
+With --fast-start (or TSIPSTER_FAST_START=1) nothing is preloaded: gunicorn
+binds at once and every worker loads and warms the engine on a background
+thread, answering /readyz with 503 until it is ready. Workers then hold their
+own copy of the bet store instead of sharing the master's.
+
+Defaults come from TSIPSTER_WORKERS, TSIPSTER_THREADS and TSIPSTER_BIND.
+Gunicorn needs fork(), so on Windows this falls back to a single waitress
+process with a thread pool.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+
+# Scale with processes, not torch intra-op threads; this also keeps OpenMP
+# thread pools out of the master process before it forks
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+
+def default_workers():
+    return int(os.environ.get('TSIPSTER_WORKERS', multiprocessing.cpu_count()))
+
+
+def default_threads():
+    return int(os.environ.get('TSIPSTER_THREADS', 4))
+
+
+def preload():
+    """Import the app and warm everything workers will share"""
+    # Importing the app loads the engine and fills the score cache and candidate
+    # tables (slips.warm_up) before forking, so every worker inherits them
+    import app
+    # Move everything loaded so far out of the collector's reach, so GC passes in
+    # the workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    return app.app
+
+
+def post_fork(server, worker):
+    import instrumentation
+    # The logging listener thread only exists in the master process
+    instrumentation.setup_logging(instrumentation.default_log_level())
+
+
+def load_app():
+    import app
+    return app.app
+
+
+def serve_gunicorn(application, bind, workers, threads, timeout):
+    """Serve a preloaded application, or with application=None import it in each worker"""
+    from gunicorn.app.base import BaseApplication
+
+    class TsipsterApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread' if threads > 1 else 'sync')
+            self.cfg.set('timeout', timeout)
+            self.cfg.set('preload_app', application is not None)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return application or load_app()
+
+    TsipsterApplication().run()
+
+
+def serve_waitress(application, bind, threads):
+    from waitress import serve
+    serve(application, listen=bind, threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Tsipster API with preforked workers")
+    parser.add_argument('--bind', default=os.environ.get('TSIPSTER_BIND', '127.0.0.1:5000'))
+    parser.add_argument('--workers', type=int, default=default_workers(), help="worker processes (default: CPU count)")
+    parser.add_argument('--threads', type=int, default=default_threads(), help="request threads per worker")
+    parser.add_argument('--timeout', type=int, default=60, help="seconds before a stuck worker is restarted")
+    parser.add_argument('--fast-start', action='store_true',
+                        help="bind immediately and load the engine in the background of each worker")
+    args = parser.parse_args()
+    if args.fast_start:
+        os.environ['TSIPSTER_FAST_START'] = '1'
+    # Importing slips alone does not load the engine
+    import slips
+    fast_start = slips.fast_start_enabled()
+
+    if hasattr(os, 'fork'):
+        serve_gunicorn(None if fast_start else preload(), args.bind, args.workers, args.threads, args.timeout)
+    else:
+        print("fork() is not available; serving from a single waitress process")
+        serve_waitress(load_app() if fast_start else preload(), args.bind, args.threads)
+
+
+if __name__ == "__main__":
+    main()
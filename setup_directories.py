@@ -7,6 +7,9 @@ def create_directories():
     # Create base directories
     directories = [
         'odds/winmasters',
+        'odds/novibet',
+        'odds/stoiximan',
+        'odds/bet365',
         'matches/winmasters/uel',
         'profile',
         'static/images',
@@ -59,5 +62,6 @@ if __name__ == "__main__":
     print("\nDirectory setup complete.")
     print("Next steps:")
     print("1. Run the winmasters scraper: python scrapers/winmasters_scraper.py")
+    print("   (or keep the odds fresh with: python scrapers/refresh_scheduler.py)")
     print("2. Start the Flask server: python app.py")
     print("3. Start the Flutter app: cd flutter_tsipster && flutter run -d chrome")
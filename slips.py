@@ -0,0 +1,776 @@
+"""Slip-building logic shared by the Flask API (app.py) and the asyncio API (app_async.py).
+
+Handlers take the request JSON and the client's session (any mutable mapping),
+update session['selected_bets'] and session['current_total_odds'] in place and
+return a (body, status) pair. Training goes through a `train` callable so the
+async server can run it as a background task.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from functools import reduce
+
+import numpy as np
+
+from instrumentation import log_event, log_payload, stage_timer
+
+# The bet_suggestor module, loaded by start_engine. Importing it loads the odds,
+# bet store and weights; until it is loaded (or if loading fails) the handlers
+# serve sample data.
+bet_suggestor = None
+bs_imported = False
+# 'stopped', 'loading', 'ready' or 'failed', with the error of a failed load
+engine_status = {'state': 'stopped', 'error': None, 'load_seconds': None}
+engine_lock = threading.Lock()
+
+def fast_start_enabled():
+    return os.environ.get('TSIPSTER_FAST_START', '').lower() in ('1', 'true', 'yes')
+
+def start_engine(background=None):
+    """Load and warm the bet engine once, inline or on a background thread.
+
+    In the background (the default when TSIPSTER_FAST_START is set) the server
+    binds immediately and /readyz reports 503 until the engine is warm.
+    """
+    if background is None:
+        background = fast_start_enabled()
+    with engine_lock:
+        if engine_status['state'] != 'stopped':
+            return
+        engine_status['state'] = 'loading'
+    if background:
+        threading.Thread(target=load_engine, name='engine-load', daemon=True).start()
+    else:
+        load_engine()
+
+def load_engine():
+    global bet_suggestor, bs_imported
+    start = time.perf_counter()
+    try:
+        import bet_suggestor as engine
+        bet_suggestor = engine
+        bs_imported = True
+        warm_up()
+    except Exception as e:
+        bs_imported = False
+        engine_status.update(state='failed', error=str(e))
+        log_event('bet_suggestor_import_failed', logging.ERROR, error=str(e))
+        return
+    engine_status.update(state='ready', load_seconds=round(time.perf_counter() - start, 3))
+    log_event('engine_ready', load_seconds=engine_status['load_seconds'])
+
+def warm_up():
+    """Fill the score cache and candidate tables, then build one throwaway slip so
+    the first real request finds every code path and cache warm. Raises if the
+    slip fails, so a broken engine is reported as failed instead of ready"""
+    bet_suggestor.get_candidate_tables()
+    body, status = generate_bets({'numBets': 3, 'seed': 0}, {})
+    if status != 200:
+        raise RuntimeError(f"warm-up slip failed with {status}: {body.get('error', body)}")
+
+def engine_loaded():
+    """True once requests no longer have to wait for the engine (loaded or failed)"""
+    return engine_status['state'] in ('ready', 'failed')
+
+def health():
+    """Handle GET /healthz: the process is up and serving"""
+    return {'status': 'ok', 'engine': engine_status['state']}, 200
+
+def readiness():
+    """Handle GET /readyz: 200 only once the engine is loaded and warm"""
+    body = dict(engine_status)
+    if engine_status['state'] == 'ready':
+        body['snapshot_version'] = bet_suggestor.snapshot_version
+        body['bets'] = len(bet_suggestor.bets)
+        return body, 200
+    return body, 503
+
+# Sample data for demonstration purposes
+sample_matches = [
+    {"id": 1, "name": "Liverpool vs Manchester United", "markets": [
+        {"name": "1X2", "outcomes": [{"name": "1", "odds": 1.90}, {"name": "X", "odds": 3.50}, {"name": "2", "odds": 4.20}]},
+        {"name": "Over/Under 2.5", "outcomes": [{"name": "Over", "odds": 1.85}, {"name": "Under", "odds": 1.95}]}
+    ]},
+    {"id": 2, "name": "Barcelona vs Real Madrid", "markets": [
+        {"name": "1X2", "outcomes": [{"name": "1", "odds": 2.10}, {"name": "X", "odds": 3.30}, {"name": "2", "odds": 3.40}]},
+        {"name": "Over/Under 2.5", "outcomes": [{"name": "Over", "odds": 1.75}, {"name": "Under", "odds": 2.05}]}
+    ]},
+    {"id": 3, "name": "Bayern Munich vs Dortmund", "markets": [
+        {"name": "1X2", "outcomes": [{"name": "1", "odds": 1.60}, {"name": "X", "odds": 3.80}, {"name": "2", "odds": 5.50}]},
+        {"name": "Over/Under 2.5", "outcomes": [{"name": "Over", "odds": 1.55}, {"name": "Under", "odds": 2.45}]}
+    ]},
+]
+
+def generate_bets(data, session):
+    """Build a new slip from the generate-bets parameters"""
+    try:
+        log_payload('generate_bets_request', data)
+        
+        # Update parameter names to match Flutter app
+        requested_bets = int(data.get('numBets', 3))
+        min_odds = float(data.get('minOdds', 2.0))
+        max_odds = float(data.get('maxOdds', 15.0))
+        unique_match_only = data.get('uniqueMatchOnly', True)
+        rng = make_request_rng(data)
+        
+        if not bs_imported:
+            # Use sample data if bet_suggestor module is not available
+            return generate_sample_bets(requested_bets, min_odds, max_odds, unique_match_only, rng), 200
+        
+        # Get reference to the bet suggestor module
+        bs = bet_suggestor
+        bs.refresh()
+        
+        # Get the maximum number of unique matches available
+        max_matches = bs.get_max_unique_matches()
+        
+        # Limit number of bets to available unique matches if unique match only is enabled
+        if unique_match_only and requested_bets > max_matches:
+            num_bets = max_matches
+            log_event('bets_limited', requested=requested_bets, max_matches=max_matches)
+        else:
+            num_bets = requested_bets
+        
+        log_event('generate_bets', num_bets=num_bets, min_odds=min_odds, max_odds=max_odds)
+        
+        # Get the available bets and their cached NN scores from the module
+        bets, nn_scores = bs.get_scored_bets()
+        
+        # Check the odds window against the per-match odds bounds first and aim for
+        # the part of it the slip can reach, instead of finding out bet by bet
+        plan = bs.plan_slip(num_bets, min_odds, max_odds, unique_match_only)
+        target_low, target_high = plan['target']
+        if not plan['feasible']:
+            log_event('odds_window_unreachable', min_odds=min_odds, max_odds=max_odds, achievable=plan['achievable'])
+        
+        # Our betting slip
+        selected_bets = []
+        current_total_odds = 1.0
+        used_matches = set()
+        
+        # Select bets with dynamic odds filtering
+        for k in range(num_bets if plan['achievable'] else 0):
+            low, high = bs.get_next_odds_range(current_total_odds, k, num_bets, target_low, target_high, rng)
+            # Once the unused matches run out, the remaining bets allow duplicates
+            if unique_match_only and k >= plan['unique_bets']:
+                unique_match_only = False
+            
+            # Filter bets within the current odds range, or take any odds if none are in it
+            with stage_timer('filter'):
+                if unique_match_only:
+                    available_bets = [bet for bet in bets if bet['match'] not in used_matches and low <= bet['odds'] <= high]
+                    if not available_bets:
+                        available_bets = [bet for bet in bets if bet['match'] not in used_matches]
+                else:
+                    available_bets = [bet for bet in bets if low <= bet['odds'] <= high] or bets
+            
+            if not available_bets:
+                break
+            
+            # Score available bets and select the highest-scored one
+            with stage_timer('selection'):
+                scores = bs.score_candidates(available_bets, nn_scores, rng)
+                best_bet = available_bets[int(np.argmax(scores))]
+            
+            # Store all relevant bet information
+            bet_info = {
+                'id': len(selected_bets),
+                'match': best_bet['match'],
+                'market': best_bet['market'],
+                'group': best_bet['group'] if 'group' in best_bet else '',
+                'outcome': best_bet['outcome'],
+                'odds': best_bet['odds'],
+                'bookmaker': best_bet.get('bookmaker', '')
+            }
+            selected_bets.append(bet_info)
+            
+            if unique_match_only:
+                used_matches.add(best_bet['match'])
+            current_total_odds *= best_bet['odds']
+        
+        # Store in session for later access
+        session['selected_bets'] = selected_bets
+        session['current_total_odds'] = current_total_odds
+        
+        # Format response for API - ensure consistent format
+        formatted_bets = []
+        for bet in selected_bets:
+            formatted_bets.append({
+                "id": bet["id"],
+                "match": bet["match"],
+                "market": bet["market"],
+                "group": bet["group"] if "group" in bet else "",
+                "outcome": bet["outcome"],
+                "odds": bet["odds"],
+                "bookmaker": bet.get("bookmaker", "")
+            })
+        
+        result = {
+            "bets": formatted_bets,
+            "totalOdds": round(current_total_odds, 2),
+            "limitedBets": num_bets != requested_bets,
+            "maxAvailableMatches": max_matches,
+            "oddsReachable": plan['feasible'],
+            "achievableOdds": [round(odds, 2) for odds in plan['achievable']] if plan['achievable'] else None
+        }
+        log_payload('generate_bets_response', result)
+        return result, 200
+        
+    except RequestError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        log_event('generate_bets_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
+
+class RequestError(ValueError):
+    """Invalid request parameter; the handlers answer it with 400"""
+
+def make_request_rng(data):
+    """Random generator for one request, seeded by the optional 'seed' parameter (a non-negative integer)"""
+    seed = data.get('seed')
+    if seed is None:
+        return np.random.default_rng()
+    if isinstance(seed, str) and seed.isdigit():
+        seed = int(seed)
+    if isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise RequestError(f"seed must be a non-negative integer, got {seed!r}")
+    return np.random.default_rng(seed)
+
+def choose(rng, items):
+    """Pick one element of a list with the request's random generator"""
+    return items[int(rng.integers(len(items)))]
+
+def next_bet_id(bets):
+    """First id above every bet in the slip, so ids stay unique across rejections"""
+    return max((bet['id'] for bet in bets), default=-1) + 1
+
+def as_delta(body, full_key, removed_ids):
+    """Replace the full slip in a response with the ids of the bets that left it.
+
+    Clients that send 'delta': true patch their slip by id: drop removed_ids,
+    then append new_bets.
+    """
+    body.pop(full_key, None)
+    body['removed_ids'] = list(removed_ids)
+    return body
+
+def generate_sample_bets(num_bets, min_odds, max_odds, unique_match_only, rng):
+    """Generate sample bets when bet_suggestor is not available"""
+    generated_bets = []
+    used_match_ids = set()
+    
+    # Get maximum unique matches available from sample data
+    max_matches = len(sample_matches)
+    
+    # Limit number of bets to available unique matches if unique match only is enabled
+    if unique_match_only and num_bets > max_matches:
+        actual_num_bets = max_matches
+        log_event('bets_limited', requested=num_bets, max_matches=max_matches)
+    else:
+        actual_num_bets = num_bets
+    
+    for _ in range(min(actual_num_bets, 10)):
+        eligible_matches = [m for m in sample_matches if (unique_match_only and m["id"] not in used_match_ids) or not unique_match_only]
+        if not eligible_matches:
+            break
+            
+        match = choose(rng, eligible_matches)
+        market = choose(rng, match["markets"])
+        outcome = choose(rng, market["outcomes"])
+        
+        bet = {
+            "id": len(generated_bets),
+            "match": match["name"],
+            "market": market["name"],
+            "group": "",
+            "outcome": outcome["name"],
+            "odds": outcome["odds"]
+        }
+        
+        generated_bets.append(bet)
+        used_match_ids.add(match["id"])
+    
+    # Calculate total odds
+    total_odds = round(reduce(lambda x, y: x * y, [bet["odds"] for bet in generated_bets], 1), 2)
+    
+    return {
+        "bets": generated_bets,
+        "totalOdds": total_odds,
+        "limitedBets": actual_num_bets != num_bets,
+        "maxAvailableMatches": max_matches
+    }
+
+def train_now(bet_list, label):
+    bet_suggestor.train_model(bet_list, label)
+
+def accept_bets(session, train=train_now):
+    """Accept all bets and train the model"""
+    try:
+        selected_bets = session.get('selected_bets', [])
+        
+        if not selected_bets:
+            return {'message': 'No bets to accept'}, 400
+            
+        # Train the neural network with positive examples
+        if bs_imported:
+            train(selected_bets, 1.0)
+        
+        return {'message': 'All bets accepted and neural network updated!'}, 200
+    
+    except Exception as e:
+        log_event('accept_bets_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
+
+def reject_bets(data, session, train=train_now):
+    """Reject selected bets and train the model"""
+    try:
+        reject_indices = data.get('reject_indices', [])
+        get_replacements = data.get('get_replacements', True)  # Default to true
+        
+        selected_bets = session.get('selected_bets', [])
+        current_total_odds = session.get('current_total_odds', 1.0)
+        
+        if not selected_bets:
+            return {'message': 'No bets to reject'}, 400
+            
+        rejected = [selected_bets[idx] for idx in reject_indices if 0 <= idx < len(selected_bets)]
+        
+        # Train the neural network with negative examples
+        if bs_imported:
+            train(rejected, 0.0)
+        
+        # Remove rejected bets
+        updated_bets = [bet for i, bet in enumerate(selected_bets) if i not in reject_indices]
+        
+        # Recalculate total odds
+        if updated_bets:
+            new_total_odds = math.prod(bet['odds'] for bet in updated_bets)
+        else:
+            new_total_odds = 0
+            
+        # Update session
+        session['selected_bets'] = updated_bets
+        session['current_total_odds'] = new_total_odds
+        
+        result = {
+            'message': 'Bets rejected and neural network updated!',
+            'updated_bets': updated_bets,
+            'total_odds': round(new_total_odds, 2),
+            'replacements_needed': len(reject_indices) if get_replacements else 0
+        }
+        if data.get('delta'):
+            result = as_delta(result, 'updated_bets', [bet['id'] for bet in rejected])
+        return result, 200
+    
+    except Exception as e:
+        log_event('reject_bets_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
+
+def get_replacement_bets(data, session):
+    """Get replacement bets for rejected ones"""
+    try:
+        num_needed = int(data.get('num_needed', 1))
+        min_odds = float(data.get('min_odds', 2.0))
+        max_odds = float(data.get('max_odds', 15.0))
+        unique_match_only = data.get('unique_match_only', True)
+        avoid_matches = data.get('avoid_matches', [])  # NEW: matches to avoid
+        rng = make_request_rng(data)
+        
+        selected_bets = session.get('selected_bets', [])
+        current_total_odds = session.get('current_total_odds', 1.0)
+        
+        if num_needed <= 0:
+            return {'message': 'No replacement bets needed'}, 400
+            
+        if not bs_imported:
+            # Use sample data for replacements if model not available
+            result = generate_replacement_sample_bets(num_needed, selected_bets, unique_match_only, rng, avoid_matches)
+            return (as_delta(result, 'all_bets', []) if data.get('delta') else result), 200
+        
+        bs = bet_suggestor
+        bs.refresh()
+        # Candidates come from the per-match tables instead of rescoring every bet
+        nn_scores, tables = bs.get_candidate_tables()
+        
+        # Get already used matches to avoid them when unique_match_only is True
+        used_matches = set(bet['match'] for bet in selected_bets)
+        # Add rejected matches to the avoid list
+        avoid_matches = set(avoid_matches)
+        used_matches.update(avoid_matches)
+        
+        new_bets = []
+        first_id = next_bet_id(selected_bets)
+        
+        # For logging purposes
+        log_event('get_replacement_bets', num_needed=num_needed, current_bets=len(selected_bets), avoid_matches=sorted(avoid_matches))
+        
+        # Know up front how many replacements the unused matches can supply and
+        # which total odds the slip can still reach
+        plan = bs.plan_slip(num_needed, min_odds, max_odds, unique_match_only, used_matches, avoid_matches, current_total_odds)
+        target_low, target_high = plan['target']
+        if not plan['feasible']:
+            log_event('odds_window_unreachable', min_odds=min_odds, max_odds=max_odds, achievable=plan['achievable'])
+        
+        for k in range(num_needed if plan['achievable'] else 0):
+            # Calculate appropriate odds range for this replacement
+            total_target_bets = len(selected_bets) + num_needed
+            current_position = len(selected_bets) + k
+            low, high = bs.get_next_odds_range(current_total_odds, current_position, total_target_bets, target_low, target_high, rng)
+            
+            log_event('replacement_odds_range', logging.DEBUG, replacement=k + 1, low=low, high=high, current_total_odds=current_total_odds)
+            
+            if unique_match_only and k >= plan['unique_bets']:
+                log_event('replacement_allowing_duplicates')
+                unique_match_only = False
+            
+            # Filter bets - IMPORTANT: Avoid using already rejected matches, even
+            # when not requiring unique matches
+            exclude = used_matches if unique_match_only else avoid_matches
+            with stage_timer('filter'):
+                available_bets = bs.lookup_candidates(tables, low, high, exclude)
+                if not available_bets:
+                    # Relaxed filtering if no bets are available in the range
+                    available_bets = bs.lookup_best(tables, exclude)
+            
+            if not available_bets:
+                log_event('no_replacement_found', logging.WARNING)
+                break
+            
+            # Score and select
+            with stage_timer('selection'):
+                scores = bs.score_candidates(available_bets, nn_scores, rng)
+                best_bet = available_bets[int(np.argmax(scores))]
+            
+            # Create bet info
+            bet_info = {
+                'id': first_id + len(new_bets),
+                'match': best_bet['match'],
+                'market': best_bet['market'],
+                'group': best_bet['group'] if 'group' in best_bet else '',
+                'outcome': best_bet['outcome'],
+                'odds': best_bet['odds'],
+                'bookmaker': best_bet.get('bookmaker', '')
+            }
+            new_bets.append(bet_info)
+            
+            if unique_match_only:
+                used_matches.add(best_bet['match'])
+            current_total_odds *= best_bet['odds']
+        
+        # Update session with both existing bets and new replacements
+        updated_bets = selected_bets + new_bets
+        session['selected_bets'] = updated_bets
+        session['current_total_odds'] = current_total_odds
+        
+        log_event('replacement_bets_added', added=len(new_bets), total=len(updated_bets))
+        
+        result = {
+            'new_bets': new_bets,
+            'all_bets': updated_bets,
+            'total_odds': round(current_total_odds, 2),
+            'odds_reachable': plan['feasible'],
+            'achievable_odds': [round(odds, 2) for odds in plan['achievable']] if plan['achievable'] else None
+        }
+        if data.get('delta'):
+            result = as_delta(result, 'all_bets', [])
+        return result, 200
+        
+    except RequestError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        log_event('get_replacement_bets_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
+
+def generate_replacement_sample_bets(num_needed, existing_bets, unique_match_only, rng, avoid_matches=[]):
+    """Generate sample replacement bets when bet_suggestor is not available"""
+    generated_bets = []
+    used_match_ids = set()
+    
+    # Track already used matches from existing bets
+    for bet in existing_bets:
+        match_name = bet['match']
+        for sample_match in sample_matches:
+            if sample_match['name'] == match_name:
+                used_match_ids.add(sample_match['id'])
+    
+    # Also track matches to avoid (from rejected bets)
+    avoid_match_ids = set()
+    for avoid_match in avoid_matches:
+        for sample_match in sample_matches:
+            if sample_match['name'] == avoid_match:
+                avoid_match_ids.add(sample_match['id'])
+    
+    current_total_odds = reduce(lambda x, y: x * y, [bet['odds'] for bet in existing_bets], 1.0)
+    
+    for _ in range(min(num_needed, 10)):
+        # Filter out both used and avoided matches
+        eligible_matches = [
+            m for m in sample_matches 
+            if (unique_match_only and m["id"] not in used_match_ids and m["id"] not in avoid_match_ids) 
+            or (not unique_match_only and m["id"] not in avoid_match_ids)
+        ]
+        
+        if not eligible_matches:
+            break
+            
+        match = choose(rng, eligible_matches)
+        market = choose(rng, match["markets"])
+        outcome = choose(rng, market["outcomes"])
+        
+        bet = {
+            "id": next_bet_id(existing_bets) + len(generated_bets),
+            "match": match["name"],
+            "market": market["name"],
+            "group": "",
+            "outcome": outcome["name"],
+            "odds": outcome["odds"]
+        }
+        
+        generated_bets.append(bet)
+        used_match_ids.add(match["id"])
+        current_total_odds *= outcome["odds"]
+    
+    # Create final bet list with existing and new bets
+    all_bets = existing_bets + generated_bets
+    
+    return {
+        "new_bets": generated_bets,
+        "all_bets": all_bets,
+        "total_odds": round(current_total_odds, 2)
+    }
+
+def get_same_match_alternatives(data, session):
+    """Get alternative bets for the same matches"""
+    try:
+        target_matches = data.get('target_matches', [])
+        num_needed = int(data.get('num_needed', 1))
+        current_odds = float(data.get('current_odds', 1.0))
+        min_total_odds = float(data.get('min_total_odds', 2.0))
+        max_total_odds = float(data.get('max_total_odds', 15.0))
+        rejected_indices = data.get('rejected_bet_indices', [])
+        rejected_bet_options = data.get('rejected_bet_options', {})
+        rng = make_request_rng(data)
+        
+        log_payload('get_same_match_alternatives_request', data)
+        
+        # Get current bets from session
+        selected_bets = session.get('selected_bets', [])
+        
+        # Keep track of which bets were kept (not rejected)
+        kept_bets = [bet for i, bet in enumerate(selected_bets) if i not in rejected_indices]
+        
+        # Identify which matches we need alternatives for
+        rejected_bets = [bet for i, bet in enumerate(selected_bets) if i in rejected_indices]
+        
+        if not target_matches or num_needed <= 0:
+            return {'message': 'No alternatives needed'}, 400
+        
+        log_event('get_same_match_alternatives', target_matches=target_matches, current_odds=current_odds)
+        
+        removed_ids = [bet['id'] for bet in rejected_bets]
+        
+        if not bs_imported:
+            result = generate_alternative_sample_bets(
+                target_matches, kept_bets, num_needed, current_odds, 
+                min_total_odds, max_total_odds, rng, rejected_bet_options)
+            return (as_delta(result, 'all_bets', removed_ids) if data.get('delta') else result), 200
+        
+        bs = bet_suggestor
+        bs.refresh()
+        nn_scores, tables = bs.get_candidate_tables()
+        
+        new_bets = []
+        first_id = next_bet_id(selected_bets)
+        
+        # Process one match at a time to ensure we get exactly one bet per rejected match
+        for match_name in target_matches:
+            # Filter bets to only include those from this specific match
+            with stage_timer('filter'):
+                match_bets = tables[match_name]['bets'] if match_name in tables else []
+            
+            log_event('alternatives_found', logging.DEBUG, match=match_name, candidates=len(match_bets))
+            
+            if not match_bets:
+                log_event('no_alternatives_found', logging.WARNING, match=match_name)
+                continue
+                
+            # Get previously rejected options for this match
+            match_rejected_options = rejected_bet_options.get(match_name, [])
+            
+            # Score all available bets for this match
+            with stage_timer('selection'):
+                scored_bets = []
+                for bet in match_bets:
+                    # Skip if this bet option was previously rejected
+                    bet_key = f"{bet['market']}|{bet['outcome']}"
+                    if bet_key in match_rejected_options:
+                        continue
+                
+                    # Also skip the immediately rejected bets
+                    skip = False
+                    for rejected in rejected_bets:
+                        if (bet['match'] == rejected['match'] and 
+                            bet['market'] == rejected['market'] and 
+                            bet['outcome'] == rejected['outcome']):
+                            skip = True
+                            break
+                
+                    if skip:
+                        continue
+                
+                    base_score = bet['preference_score'] * nn_scores[bet['index']]
+                
+                    # Adjust score based on how close odds are to ideal
+                    ideal_odds = 1.0
+                    if min_total_odds > current_odds:
+                        ideal_odds = min_total_odds / current_odds
+                    odds_factor = 1.0 - abs(bet['odds'] - ideal_odds) / 10.0  # Prioritize odds close to ideal
+                    bet['total_score'] = base_score * odds_factor
+                
+                    scored_bets.append(bet)
+            
+            if not scored_bets:
+                log_event('no_alternatives_after_filtering', logging.WARNING, match=match_name)
+                continue
+                
+            # Sort by score and take the best option for this match
+            best_bet = max(scored_bets, key=lambda bet: bet['total_score'])
+            
+            bet_info = {
+                'id': first_id + len(new_bets),
+                'match': best_bet['match'],
+                'market': best_bet['market'],
+                'group': best_bet['group'] if 'group' in best_bet else '',
+                'outcome': best_bet['outcome'],
+                'odds': best_bet['odds'],
+                'bookmaker': best_bet.get('bookmaker', '')
+            }
+            new_bets.append(bet_info)
+        
+        total_odds = current_odds
+        for bet in new_bets:
+            total_odds *= bet['odds']
+        
+        updated_bets = kept_bets + new_bets
+        session['selected_bets'] = updated_bets
+        session['current_total_odds'] = total_odds
+        
+        log_event('alternatives_returned', count=len(new_bets), total_odds=total_odds)
+        
+        result = {
+            'new_bets': new_bets,
+            'all_bets': updated_bets,
+            'total_odds': round(total_odds, 2)
+        }
+        if data.get('delta'):
+            result = as_delta(result, 'all_bets', removed_ids)
+        return result, 200
+    
+    except RequestError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        log_event('get_same_match_alternatives_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
+
+def generate_alternative_sample_bets(target_matches, kept_bets, num_needed, current_odds, 
+                                     min_total_odds, max_total_odds, rng, rejected_bet_options=None):
+    """Generate alternative sample bets for the specified matches"""
+    if rejected_bet_options is None:
+        rejected_bet_options = {}
+    
+    generated_bets = []
+    
+    min_combined_new_odds = min_total_odds / current_odds
+    max_combined_new_odds = max_total_odds / current_odds
+    
+    for match_name in target_matches:
+        if len(generated_bets) >= num_needed:
+            break
+            
+        sample_match = None
+        for match in sample_matches:
+            if match["name"] == match_name:
+                sample_match = match
+                break
+        
+        if not sample_match:
+            for match in sample_matches:
+                if len(generated_bets) < num_needed:
+                    sample_match = match
+                    break
+        
+        if sample_match:
+            match_rejected_options = rejected_bet_options.get(match_name, [])
+            
+            eligible_options = []
+            
+            for market in sample_match["markets"]:
+                for outcome in market["outcomes"]:
+                    bet_key = f"{market['name']}|{outcome['name']}"
+                    if bet_key not in match_rejected_options:
+                        eligible_options.append({
+                            "market": market,
+                            "outcome": outcome
+                        })
+            
+            if not eligible_options:
+                log_event('all_options_rejected', match=match_name)
+                for market in sample_match["markets"]:
+                    for outcome in market["outcomes"]:
+                        eligible_options.append({
+                            "market": market,
+                            "outcome": outcome
+                        })
+            
+            chosen = choose(rng, eligible_options)
+            market = chosen["market"]
+            outcome = chosen["outcome"]
+            
+            target_odds = (min_combined_new_odds + max_combined_new_odds) / 2
+            if num_needed > 1:
+                target_odds = target_odds ** (1 / num_needed)
+                
+            closest_outcome = min(market["outcomes"], 
+                                 key=lambda o: abs(o["odds"] - target_odds))
+            
+            bet = {
+                "id": next_bet_id(kept_bets) + len(generated_bets),
+                "match": sample_match["name"],
+                "market": market["name"],
+                "group": "",
+                "outcome": closest_outcome["name"],
+                "odds": closest_outcome["odds"]
+            }
+            
+            generated_bets.append(bet)
+    
+    total_odds = current_odds
+    for bet in generated_bets:
+        total_odds *= bet["odds"]
+    
+    all_bets = kept_bets + generated_bets
+    
+    return {
+        "new_bets": generated_bets,
+        "all_bets": all_bets,
+        "total_odds": round(total_odds, 2)
+    }
+
+def market_scan(args):
+    """Surebets, value prices or overround per group from the current snapshot's scan; args are the query parameters"""
+    try:
+        if not bs_imported:
+            return {'error': 'Odds are not loaded'}, 503
+        bet_suggestor.refresh_odds()
+        kind = args.get('kind', 'surebets')
+        limit = int(args.get('limit', 50))
+        min_edge = float(args.get('min_edge', 0.0))
+        results = bet_suggestor.market_scan.query(kind, limit=limit, match=args.get('match'), min_edge=min_edge)
+        return {'kind': kind, 'results': results}, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        log_event('market_scan_failed', logging.ERROR, error=str(e))
+        return {'error': str(e)}, 500
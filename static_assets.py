@@ -0,0 +1,159 @@
+"""In-memory index of the Flutter web build for serving static assets.
+
+The build directory is walked once at startup instead of hitting the filesystem
+on every request. Compressible files get gzip (and brotli, when the `brotli`
+package is installed) variants written next to them once, and each request is
+answered with the best variant the client accepts. Content-hashed assets are
+cached for a year as immutable; everything else (index.html, and the canvaskit
+and package files, which keep their names across Flutter upgrades) is
+revalidated with its ETag and answered with 304 when unchanged.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/wasm',
+                      'image/svg+xml', 'application/manifest+json', 'font/ttf', 'font/otf')
+# Files below this size are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Names carrying a content hash (main.abc123ef.js)
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.')
+
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+mimetypes.add_type('application/wasm', '.wasm')
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def is_immutable(relative_path):
+    return bool(HASHED_NAME.search(relative_path))
+
+
+def accepted_encodings(accept_encoding):
+    """Encodings from an Accept-Encoding header that the client did not refuse with q=0"""
+    encodings = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def precompress(file_path, content):
+    """Write missing or stale .gz/.br variants of a file and return {encoding: path}"""
+    variants = {}
+    mtime = os.path.getmtime(file_path)
+    for encoding, suffix in ENCODING_SUFFIXES:
+        variant_path = file_path + suffix
+        if os.path.exists(variant_path) and os.path.getmtime(variant_path) >= mtime:
+            variants[encoding] = variant_path
+            continue
+        if encoding == 'br':
+            if brotli is None:
+                continue
+            compressed = brotli.compress(content)
+        else:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            continue
+        # Written to a temporary file and renamed, so another process indexing the
+        # build never sees a truncated variant
+        tmp_file = f'{variant_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_file, variant_path)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            continue
+        variants[encoding] = variant_path
+    return variants
+
+
+class StaticIndex:
+    """Index of every file under a build directory with its serving metadata"""
+
+    def __init__(self, root, index_file='index.html', compress=True):
+        self.root = os.path.abspath(root)
+        self.index_file = index_file
+        self.entries = {}
+        if os.path.isdir(self.root):
+            self.build(compress)
+
+    def build(self, compress):
+        # Skip the variants, and the temporary files of variants being written
+        suffixes = tuple(suffix for _, suffix in ENCODING_SUFFIXES) + ('.tmp',)
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(suffixes):
+                    continue
+                file_path = os.path.join(directory, name)
+                relative_path = os.path.relpath(file_path, self.root).replace(os.sep, '/')
+                stat = os.stat(file_path)
+                content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                variants = {}
+                if compress and is_compressible(content_type) and stat.st_size >= MIN_COMPRESS_SIZE:
+                    with open(file_path, 'rb') as f:
+                        variants = precompress(file_path, f.read())
+                self.entries[relative_path] = {
+                    'path': file_path,
+                    'content_type': content_type,
+                    'etag': f'"{stat.st_size:x}-{int(stat.st_mtime * 1000):x}"',
+                    'cache_control': IMMUTABLE_CACHE if is_immutable(relative_path) else REVALIDATE_CACHE,
+                    'variants': variants,
+                }
+
+    def lookup(self, path):
+        """Entry for a request path, falling back to the app's index.html for client-side routes"""
+        return self.entries.get(path) or self.entries.get(self.index_file)
+
+    def resolve(self, path, accept_encoding=None, if_none_match=None):
+        """Work out how to answer a request.
+
+        Returns (status, file_path, headers); status is 404 when the build is
+        missing and 304 (with file_path None) when the client's copy is current.
+        """
+        entry = self.lookup(path)
+        if entry is None:
+            return 404, None, {}
+
+        file_path = entry['path']
+        encoding = None
+        encodings = accepted_encodings(accept_encoding)
+        for candidate, _ in ENCODING_SUFFIXES:
+            if candidate in entry['variants'] and candidate in encodings:
+                file_path = entry['variants'][candidate]
+                encoding = candidate
+                break
+
+        # Each encoded representation needs its own strong ETag
+        etag = entry['etag'] if encoding is None else entry['etag'][:-1] + '-' + encoding + '"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': entry['cache_control'],
+            'Content-Type': entry['content_type'],
+        }
+        if entry['variants']:
+            headers['Vary'] = 'Accept-Encoding'
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, None, headers
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return 200, file_path, headers